@@ -1,9 +1,31 @@
+import random
 from typing import Any
 from envs.game_state import GameState
+from envs.distances import get_maze_distances, UNREACHABLE
 
 class Agent:
     def __init__(self, index: int = 0):
         self.index = index
+        self.rng = random.Random()
+
+    def seed(self, seed=None) -> None:
+        self.rng.seed(seed)
+
+    def getMazeDistance(self, gameState: GameState, pos1, pos2) -> float:
+        distances = get_maze_distances(gameState.layout)
+        if distances is None:
+            return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+        return distances.getDistance(pos1, pos2)
+
+    def getMinMazeDistance(self, gameState: GameState, pos, targets) -> float:
+        if not targets:
+            return float("inf")
+        distances = get_maze_distances(gameState.layout)
+        if distances is None:
+            return min(abs(pos[0] - tx) + abs(pos[1] - ty) for tx, ty in targets)
+        nearest = int(distances.getDistances(pos, targets).min())
+        # không tới được đích nào: inf như nhánh không có đích, không trả về giá trị sentinel của bảng
+        return float("inf") if nearest == UNREACHABLE else nearest
 
     def getAction(self, gameState: GameState) -> str:
         raise NotImplementedError("This method should be overridden by subclasses")
@@ -1,7 +1,6 @@
 from base.agent import Agent
 from envs.game_state import GameState
 from envs.directions import Directions
-import random
 
 class GhostAgent(Agent):
     def __init__(self, index):
@@ -10,8 +9,8 @@ class GhostAgent(Agent):
     def getAction(self, gameState: GameState) -> str:
         legal = gameState.getLegalActions(self.index)
         if not legal:
-            return random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
-        return random.choice(legal)
+            return self.rng.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
+        return self.rng.choice(legal)
 
     def registerInitialState(self, gameState: GameState) -> None:
         self.start_state = gameState.copy()
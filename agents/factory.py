@@ -24,7 +24,8 @@ def make_agent(algo: str, index: int, **kwargs):
         return SmartGhostAgent(index)
     elif internal_algo == "dqn_pacman":
         state_shape = kwargs.get("state_shape", (1, 11, 20))  
-        return DQNPacmanAgent(index=index, state_shape=state_shape)
+        max_ghosts = kwargs.get("max_ghosts", 4)
+        return DQNPacmanAgent(index=index, state_shape=state_shape, max_ghosts=max_ghosts)
     elif internal_algo == "keyboard_pacman":
         from agents.pacman.keyboard_pacman_agent import KeyboardPacmanAgent
         return KeyboardPacmanAgent(index)
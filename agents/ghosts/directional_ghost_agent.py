@@ -7,7 +7,6 @@ from base.agent import Agent
 from base.ghost_agent import GhostAgent
 from envs.game_state import GameState
 from envs.directions import Directions
-import random
 
 class DirectionalGhostAgent(GhostAgent):
     def __init__(self, index):
@@ -15,7 +14,7 @@ class DirectionalGhostAgent(GhostAgent):
     def getAction(self, gameState: GameState) -> str:
         legal = gameState.getLegalActions(self.index)
         if not legal:
-            return random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
+            return self.rng.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
 
         ghost_x, ghost_y = gameState.getAgentPosition(self.index)
         pac_x, pac_y = gameState.getPacmanPosition()
@@ -39,4 +38,4 @@ class DirectionalGhostAgent(GhostAgent):
             if action in legal:
                 return action
 
-        return random.choice(legal)
\ No newline at end of file
+        return self.rng.choice(legal)
\ No newline at end of file
@@ -1,6 +1,5 @@
 import sys
 import os
-import random
 from base.ghost_agent import GhostAgent
 from envs.game_state import GameState
 from envs.directions import Directions, Actions
@@ -25,19 +24,19 @@ class SmartGhostAgent(GhostAgent):
             dx, dy = Actions.directionToVector(action)
             next_x, next_y = ghost_pos[0] + dx, ghost_pos[1] + dy
             
-            dist = abs(next_x - target[0]) + abs(next_y - target[1])
+            dist = self.getMazeDistance(gameState, (next_x, next_y), target)
             distances.append((dist, action))
 
         if is_scared:
             best_action = max(distances, key=lambda x: x[0])[1]
-            if random.random() < 0.2:
-                return random.choice(legal)
+            if self.rng.random() < 0.2:
+                return self.rng.choice(legal)
         else:
             distances.sort(key=lambda x: x[0])
             
-            if random.random() < 0.8:
+            if self.rng.random() < 0.8:
                 best_action = distances[0][1]
             else:
-                best_action = random.choice(legal)
+                best_action = self.rng.choice(legal)
 
         return best_action
\ No newline at end of file
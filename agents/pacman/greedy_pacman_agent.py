@@ -1,8 +1,6 @@
 from base.pacman_agent import PacmanAgent
 from envs.game_state import GameState
 from envs.directions import Directions, Actions
-import numpy as np
-import envs.layouts as layouts
 
 class GreedyPacmanAgent(PacmanAgent):
     def __init__(self, index):
@@ -13,24 +11,23 @@ class GreedyPacmanAgent(PacmanAgent):
         if not legal: return Directions.WEST
         
         px, py = gameState.getPacmanPosition()
-        
-        
-        food_indices = np.argwhere(gameState.object_matrix == layouts.FOOD)
-        
-        if len(food_indices) == 0:
-            return np.random.choice(legal)
+
+        food_positions = gameState.getFoodPositions()
+
+        if not food_positions:
+            return self.rng.choice(legal)
 
         best_action = legal[0]
         min_distance = float('inf')
+        food_list = list(food_positions)
 
         for action in legal:
             dx, dy = Actions.directionToVector(action)
             next_x, next_y = px + dx, py + dy
             
-            for f_y, f_x in food_indices:
-                dist = abs(next_x - f_x) + abs(next_y - f_y)
-                if dist < min_distance:
-                    min_distance = dist
-                    best_action = action
+            dist = self.getMinMazeDistance(gameState, (next_x, next_y), food_list)
+            if dist < min_distance:
+                min_distance = dist
+                best_action = action
                     
         return best_action
\ No newline at end of file
@@ -1,6 +1,5 @@
 import threading
 import time
-import random
 import keyboard # hoi cheat 
 
 from base.pacman_agent import PacmanAgent
@@ -44,7 +43,7 @@ class KeyboardPacmanAgent(PacmanAgent):
         if self.last_real_move in legal:
             return self.last_real_move
 
-        choice = random.choice(legal)
+        choice = self.rng.choice(legal)
         self.last_real_move = choice
         return choice
 
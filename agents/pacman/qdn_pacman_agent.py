@@ -105,8 +105,14 @@ class DQNPacmanAgent(PacmanAgent):
         features = []
         px, py = gameState.getPacmanPosition()
         features += [px / W, py / H]
-        for g in gameState.ghosts:
-            features += [g.x / W, g.y / H, g.scared_timer / 40.0]
+        ghost_xy, scared = gameState.ghost_xy, gameState.scared
+        ghost_ids = np.arange(len(ghost_xy))
+        if len(ghost_ids) > self.max_ghosts:
+            # nhiều ghost hơn số slot: giữ các ghost gần Pacman nhất, theo thứ tự index
+            dist = np.abs(ghost_xy[:, 0] - px) + np.abs(ghost_xy[:, 1] - py)
+            ghost_ids = np.sort(np.argsort(dist, kind="stable")[:self.max_ghosts])
+        for i in ghost_ids:
+            features += [ghost_xy[i, 0] / W, ghost_xy[i, 1] / H, scared[i] / 40.0]
         while len(features) < 2 + self.max_ghosts * 3:
             features.append(0.0)
 
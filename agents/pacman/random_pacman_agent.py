@@ -2,7 +2,6 @@ from base.agent import Agent
 from base.pacman_agent import PacmanAgent
 from envs.game_state import GameState
 from envs.directions import Directions
-import random
 
 
 class RandomPacManAgent(PacmanAgent):
@@ -12,5 +11,5 @@ class RandomPacManAgent(PacmanAgent):
     def getAction(self, gameState: GameState) -> str:
         legal = gameState.getLegalActions(self.index)
         if not legal:
-            return random.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
-        return random.choice(legal)
+            return self.rng.choice([Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST])
+        return self.rng.choice(legal)
@@ -1,8 +1,6 @@
 from base.pacman_agent import PacmanAgent
 from envs.game_state import GameState
 from envs.directions import Directions, Actions
-import numpy as np
-import envs.layouts as layouts
 
 class ReflexPacmanAgent(PacmanAgent):
     def __init__(self, index):
@@ -22,25 +20,24 @@ class ReflexPacmanAgent(PacmanAgent):
         return best_action
 
     def evaluationFunction(self, gameState, action):
-        from envs.layouts import FOOD, GHOST1
         px, py = gameState.getPacmanPosition()
         dx, dy = Actions.directionToVector(action)
         next_x, next_y = px + dx, py + dy
         
         for i in range(gameState.num_ghosts()):
             gx, gy = gameState.getGhostPosition(i)
-            ghost_dist = abs(next_x - gx) + abs(next_y - gy)
+            ghost_dist = self.getMazeDistance(gameState, (next_x, next_y), (gx, gy))
             if ghost_dist <= 1:
                 return -10000
             
         
         eval_score = 0
-        if gameState.object_matrix[next_y, next_x] == FOOD:
+        if gameState.is_food(next_x, next_y):
             eval_score += 10
-            
-        food_indices = np.argwhere(gameState.object_matrix == FOOD)
-        if len(food_indices) > 0:
-            min_food_dist = min([abs(next_x - fx) + abs(next_y - fy) for fy, fx in food_indices])
+
+        food_positions = gameState.getFoodPositions()
+        if food_positions:
+            min_food_dist = self.getMinMazeDistance(gameState, (next_x, next_y), list(food_positions))
             eval_score += 1.0 / (min_food_dist + 1)
             
         return eval_score
\ No newline at end of file
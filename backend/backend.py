@@ -1,130 +1,322 @@
 import sys
 import os
+import asyncio
 import socket
 import json
+import re
 import threading
 import time
+import uuid
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from ui.tkinter_ui import TkinterDisplay
-from pacman_game import PacmanGame
-from config.socket_config import HOST, PORT
-from envs.game_state import serialize_state
+from game_room import GameRoom
+from metrics import Metrics
+from outbox import ThreadedOutbox, TransportOutbox
+from config.socket_config import HOST, PORT, TRANSPORT, TRANSPORT_SHM
+from config.backend_config import (
+    NUM_AGENTS, TICK_MODE, TICK_MODE_TURN, TICK_MODE_JOINT, RECORD_DIR, SERVER_MODE, SERVER_MODE_ASYNCIO,
+    DISPLAY_INTERVAL, DEFAULT_ROOM, MAX_ROOMS, HEADLESS, METRICS_FILE, METRICS_INTERVAL,
+    OUTBOX_MAX_MESSAGES, SLOW_CLIENT_TIMEOUT, WRITE_HIGH_WATER
+)
+from envs.layout_registry import get_registry
+from envs import wire_protocol as wire
+from envs.shm_transport import block_name
 
-MAP_FILE = os.path.join(PROJECT_ROOT, "maps/mediumClassic.map")
-if not os.path.isfile(MAP_FILE):
-    raise FileNotFoundError(f"[Error] Map file not found: {MAP_FILE}")
+MAP_NAME = os.environ.get("PACMAN_MAP", "mediumClassic")
+# room_id đi vào đường dẫn replay và tên block shared memory: chỉ cho phép ký tự an toàn
+ROOM_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,32}")
+try:
+    get_registry().resolve(MAP_NAME)
+except KeyError as e:
+    raise FileNotFoundError(f"[Error] Map not found: {e}")
 
-NUM_AGENTS = 3
-state_lock = threading.Lock()
 clients_lock = threading.Lock()
 connected_clients = set() 
-ui = TkinterDisplay(zoom=1.5, frame_time=0.001)
-game = PacmanGame(MAP_FILE, display=ui)
-
-current_turn_agent = 0
-pending_actions = {}
-last_executed = {}
-paused = False
-
-def handle_action(agent_idx, action):
-    global current_turn_agent
-    with state_lock:
-        if paused:
+# conn -> {"outbox": hàng đợi gửi (ThreadedOutbox / TransportOutbox), "binary": đã chuyển sang frame nhị phân,
+#          "room": phòng mặc định của kết nối (phòng subscribe gần nhất)}
+connections = {}
+event_loop = None
+# số liệu mức server (message / byte vào ra); số liệu tick nằm ở room.metrics
+metrics = Metrics()
+
+# cửa sổ Tk của phòng mặc định; None khi chạy headless (Tk chỉ được import trong __main__)
+ui = None
+
+rooms_lock = threading.Lock()
+# room_id -> GameRoom; mỗi phòng có lock, scheduler và subscriber riêng nên tick độc lập
+rooms = {}
+
+def send_msg(conn, msg):
+    info = connections.get(conn)
+    if info is None:
+        raise ConnectionResetError("client disconnected")
+    info["outbox"].put(msg if isinstance(msg, bytes) else wire.encode_message(msg, info["binary"]))
+
+def notify_state(conn, room):
+    # phòng có state mới cho conn: writer của kết nối sẽ lấy bản mới nhất khi socket sẵn sàng
+    info = connections.get(conn)
+    if info is None:
+        raise ConnectionResetError("client disconnected")
+    info["outbox"].mark_state(room)
+
+def start_room(room):
+    # asyncio: tick của phòng là một task trên event loop; threaded: một thread riêng
+    if event_loop is not None:
+        event_loop.call_soon_threadsafe(event_loop.create_task, room.run_async())
+    else:
+        threading.Thread(target=room.run, daemon=True).start()
+
+def create_room(room_id=None, map_name=MAP_NAME, tick_mode=TICK_MODE, num_agents=NUM_AGENTS,
+                display=None, record_dir=None, start=True):
+    if tick_mode not in (TICK_MODE_TURN, TICK_MODE_JOINT):
+        raise ValueError(f"unknown tick mode '{tick_mode}' (expected '{TICK_MODE_TURN}' or '{TICK_MODE_JOINT}')")
+    num_agents = int(num_agents)
+    # agent 0 là Pacman, mỗi agent còn lại điều khiển một ghost của map
+    max_agents = 1 + get_registry().get_initial_state(map_name).num_ghosts()
+    if not 1 <= num_agents <= max_agents:
+        raise ValueError(f"num_agents must be between 1 and {max_agents} for map '{map_name}'")
+    room_id = str(room_id) if room_id else uuid.uuid4().hex[:8]
+    if not ROOM_ID_RE.fullmatch(room_id):
+        raise ValueError(f"invalid room id '{room_id}' (allowed: {ROOM_ID_RE.pattern})")
+    if record_dir is None and RECORD_DIR:
+        record_dir = os.path.join(RECORD_DIR, room_id)
+    with rooms_lock:
+        if room_id in rooms:
+            raise ValueError(f"room '{room_id}' already exists")
+        if len(rooms) >= MAX_ROOMS:
+            raise ValueError(f"room limit reached ({MAX_ROOMS})")
+        room = GameRoom(
+            room_id, map_name, notify_state, display=display, tick_mode=tick_mode,
+            num_agents=num_agents, record_dir=record_dir or None, render_in_tick=False,
+            shm_name=block_name(PORT, room_id) if TRANSPORT == TRANSPORT_SHM else None
+        )
+        rooms[room_id] = room
+    if start:
+        start_room(room)
+    print(f"[SERVER] Room created: {room_id} ({map_name}, {room.tick_mode})")
+    return room
+
+def destroy_room(room_id):
+    if room_id == DEFAULT_ROOM:
+        raise ValueError("the default room cannot be destroyed")
+    with rooms_lock:
+        room = rooms.pop(room_id, None)
+    if room is None:
+        raise KeyError(room_id)
+    room.close()
+    with room.clients_lock:
+        conns = list(room.subscribers)
+        room.subscribers.clear()
+    for conn in conns:
+        info = connections.get(conn)
+        if info is not None and info.get("room") == room_id:
+            info["room"] = None
+        try:
+            send_msg(conn, {"type": "room_closed", "room": room_id})
+        except OSError:
+            pass
+    print(f"[SERVER] Room destroyed: {room_id}")
+
+def resolve_room(conn, msg):
+    room_id = msg.get("room") or connections[conn].get("room") or DEFAULT_ROOM
+    room = rooms.get(room_id)
+    if room is None:
+        send_msg(conn, {"type": "error", "room": room_id, "error": f"unknown room '{room_id}'"})
+    return room
+
+def metrics_payload(room_ids=None) -> dict:
+    return {
+        "server": {**metrics.snapshot(), "clients": len(connected_clients), "rooms": len(rooms)},
+        "rooms": {
+            room_id: room.metrics.snapshot()
+            for room_id, room in list(rooms.items())
+            if room_ids is None or room_id in room_ids
+        }
+    }
+
+def dump_metrics_loop(path, interval):
+    # mỗi interval giây nối thêm một dòng JSON vào file: theo dõi throughput theo thời gian
+    while True:
+        time.sleep(interval)
+        line = {"time": time.time(), **metrics_payload()}
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line) + "\n")
+        except OSError as e:
+            print(f"[SERVER] Cannot write metrics to {path}: {e}")
+
+def handle_message(conn, msg):
+    msg_type = msg.get("type")
+    metrics.inc("messages_in")
+
+    if msg_type == "get_metrics":
+        # "all": true -> mọi phòng; ngược lại chỉ phòng của message / kết nối
+        if msg.get("all"):
+            send_msg(conn, {"type": "metrics", **metrics_payload()})
             return
-        if agent_idx != current_turn_agent:
+        room = resolve_room(conn, msg)
+        if room is not None:
+            send_msg(conn, {"type": "metrics", "room": room.room_id, **metrics_payload({room.room_id})})
+        return
+
+    if msg_type == "create_room":
+        try:
+            room = create_room(
+                msg.get("room"), msg.get("map") or MAP_NAME,
+                msg.get("tick_mode") or TICK_MODE,
+                NUM_AGENTS if msg.get("num_agents") is None else msg["num_agents"]
+            )
+        except (KeyError, ValueError, TypeError) as e:
+            send_msg(conn, {"type": "error", "error": f"cannot create room: {e}"})
             return
-        if isinstance(action, list) and len(action) > 0:
-            action = action[0]
-        pending_actions[agent_idx] = action
-
-def update_game_tick():
-    global current_turn_agent
-    with state_lock:
-        if paused:
+        send_msg(conn, {"type": "room_created", "room": room.room_id, "map": room.game.map_file})
+        return
+
+    if msg_type == "destroy_room":
+        try:
+            destroy_room(msg.get("room"))
+        except (KeyError, ValueError) as e:
+            send_msg(conn, {"type": "error", "room": msg.get("room"), "error": f"cannot destroy room: {e}"})
             return
-        action = pending_actions.get(current_turn_agent)
-        if action is not None:
-            applied = game.apply_action(current_turn_agent, action)
-            if applied:
-                last_executed[current_turn_agent] = action
-        pending_actions.clear()
-        if game.display:
-            game.display.update(game.get_state())
-        current_turn_agent = (current_turn_agent + 1) % NUM_AGENTS
-
-def get_current_state():
-    with state_lock:
-        return serialize_state(game.get_state())
+        send_msg(conn, {"type": "room_destroyed", "room": msg.get("room")})
+        return
 
-def handle_client(conn, addr):
-    global paused
-    client_id = f"{addr[0]}:{addr[1]}"
+    if msg_type == "list_rooms":
+        send_msg(conn, {"type": "rooms", "rooms": [r.status() for r in list(rooms.values())]})
+        return
+
+    room = resolve_room(conn, msg)
+    if room is None:
+        return
+    binary = connections[conn]["binary"]
+
+    if msg_type == "action":
+        room.submit(msg.get("agent"), msg.get("action"))
+
+    elif msg_type == "request_state":
+        # "since": version client đang có -> nhận state_delta nếu còn lịch sử; giá trị không phải int
+        # (lấy thẳng từ JSON) được coi như không có: gửi snapshot đầy đủ
+        since = msg.get("since")
+        if not isinstance(since, int) or isinstance(since, bool):
+            since = None
+        send_msg(conn, room.state_payload(since, binary))
+
+    elif msg_type == "subscribe":
+        # mỗi kết nối subscribe một phòng; phòng này thành phòng mặc định cho action nhị phân
+        previous = rooms.get(connections[conn].get("room"))
+        if previous is not None and previous is not room:
+            previous.unsubscribe(conn)
+        connections[conn]["room"] = room.room_id
+        room.subscribe(conn, msg.get("agent"), msg.get("delta"), binary)
+
+    elif msg_type == "resync":
+        if not room.resync(conn):
+            send_msg(conn, room.state_payload(None, binary))
+
+    elif msg_type == "unsubscribe":
+        room.unsubscribe(conn)
+
+    elif msg_type == "get_status":
+        res = {"type": "status", "connected": True, "num_clients": len(connected_clients), **room.status()}
+        send_msg(conn, res)
+
+    elif msg_type == "list_maps":
+        res = {"type": "maps", "room": room.room_id, "maps": get_registry().names(), "current": room.game.map_file}
+        send_msg(conn, res)
+
+    elif msg_type == "command":
+        cmd = msg.get("cmd")
+        if cmd == "pause":
+            room.set_paused(True)
+        elif cmd == "unpause":
+            room.set_paused(False)
+        elif cmd == "load_map":
+            room.load_map(msg.get("map"))
 
+class ClientSession:
+    """Giải mã luồng byte của một kết nối: JSON theo dòng cho tới khi client chọn binary."""
+
+    def __init__(self, conn, client_id):
+        self.conn = conn
+        self.client_id = client_id
+        self.buffer = b""
+        self.reader = None  # wire.FrameReader sau khi client chọn giao thức nhị phân
+
+    def feed(self, data: bytes):
+        conn = self.conn
+        metrics.inc("bytes_in", len(data))
+        if self.reader is not None:
+            for msg in self.reader.messages(data):
+                handle_message(conn, msg)
+            return
+
+        # JSON theo dòng: tách mọi dòng hoàn chỉnh một lần, phần dở dang giữ lại
+        self.buffer += data
+        lines = self.buffer.split(b"\n")
+        self.buffer = lines.pop()
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+
+            if msg.get("type") == "hello":
+                binary = msg.get("protocol") == wire.PROTOCOL_BINARY
+                protocol = wire.PROTOCOL_BINARY if binary else wire.PROTOCOL_JSON
+                send_msg(conn, {"type": "hello", "protocol": protocol})
+                if binary:
+                    connections[conn]["binary"] = True
+                    self.reader = wire.FrameReader(b"\n".join(lines[i + 1:] + [self.buffer]))
+                    self.buffer = b""
+                    for queued in self.reader.messages():
+                        handle_message(conn, queued)
+                    return
+                continue
+
+            handle_message(conn, msg)
+
+def open_session(conn, client_id, outbox):
     with clients_lock:
         connected_clients.add(client_id)
+        connections[conn] = {"outbox": outbox, "binary": False, "room": None}
         print(f"[SERVER] Client connected: {client_id} | Total: {len(connected_clients)}")
+    return ClientSession(conn, client_id)
+
+def close_session(session):
+    for room in list(rooms.values()):
+        room.unsubscribe(session.conn)
+    with clients_lock:
+        connected_clients.discard(session.client_id)
+        info = connections.pop(session.conn, None)
+        if info is not None:
+            info["outbox"].close()
+        print(f"[SERVER] Client disconnected: {session.client_id} | Total: {len(connected_clients)}")
 
-    buffer = ""
+def handle_client(conn, addr):
+    # timeout giới hạn mỗi lần ghi của writer; reader chỉ bỏ qua khi client im lặng
+    conn.settimeout(SLOW_CLIENT_TIMEOUT)
+    outbox = ThreadedOutbox(conn, OUTBOX_MAX_MESSAGES, SLOW_CLIENT_TIMEOUT, metrics)
+    session = open_session(conn, f"{addr[0]}:{addr[1]}", outbox)
     try:
         while True:
-            data = conn.recv(8192)
+            try:
+                data = conn.recv(65536)
+            except socket.timeout:
+                continue
             if not data:
                 break
-
-            buffer += data.decode("utf-8")
-            while "\n" in buffer:
-                line, buffer = buffer.split("\n", 1)
-                if not line.strip():
-                    continue
-
-                try:
-                    msg = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                msg_type = msg.get("type")
-
-                if msg_type == "action":
-                    handle_action(msg.get("agent"), msg.get("action"))
-
-                elif msg_type == "request_state":
-                    res = {
-                        "type": "state",
-                        "state": get_current_state(),
-                        "current_turn": current_turn_agent
-                    }
-                    conn.sendall((json.dumps(res) + "\n").encode("utf-8"))
-
-                elif msg_type == "get_status":
-                    res = {
-                        "type": "status",
-                        "connected": True,
-                        "num_clients": len(connected_clients),
-                        "last_executed": last_executed,
-                        "paused": paused
-                    }
-                    conn.sendall((json.dumps(res) + "\n").encode("utf-8"))
-
-                elif msg_type == "command":
-                    cmd = msg.get("cmd")
-                    if cmd == "pause":
-                        paused = True
-                        game.set_pause(True)
-                    elif cmd == "unpause":
-                        paused = False
-                        game.set_pause(False)
+            session.feed(data)
 
     except ConnectionResetError:
-        print(f"[SERVER] Client reset connection: {client_id}")
+        print(f"[SERVER] Client reset connection: {session.client_id}")
 
     finally:
-        with clients_lock:
-            connected_clients.discard(client_id)
-            print(f"[SERVER] Client disconnected: {client_id} | Total: {len(connected_clients)}")
+        close_session(session)
         conn.close()
 
 def start_server():
@@ -137,6 +329,7 @@ def start_server():
     try:
         while True:
             conn, addr = s.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             threading.Thread(
                 target=handle_client,
                 args=(conn, addr),
@@ -145,12 +338,88 @@ def start_server():
     finally:
         s.close()
 
-def game_loop():
-    while True:
-        update_game_tick()
-        time.sleep(0.05)
+class AsyncClientProtocol(asyncio.Protocol):
+    """Kết nối trong server asyncio; toàn bộ xử lý message chạy trên event loop."""
+
+    def connection_made(self, transport):
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        host, port = transport.get_extra_info("peername")[:2]
+        self.transport = transport
+        self.outbox = TransportOutbox(self, transport, OUTBOX_MAX_MESSAGES, SLOW_CLIENT_TIMEOUT,
+                                      WRITE_HIGH_WATER, metrics)
+        self.session = open_session(self, f"{host}:{port}", self.outbox)
+
+    def pause_writing(self):
+        self.outbox.pause_writing()
+
+    def resume_writing(self):
+        self.outbox.resume_writing()
+
+    def data_received(self, data):
+        try:
+            self.session.feed(data)
+        except ConnectionResetError as e:
+            # SlowClientError (outbox đã abort) hoặc outbox đã đóng: connection_lost sẽ dọn phiên
+            print(f"[SERVER] Client reset connection: {self.session.client_id} ({e})")
+            self.transport.abort()
+
+    def connection_lost(self, exc):
+        close_session(self.session)
+
+async def serve_async():
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    server = await event_loop.create_server(AsyncClientProtocol, HOST, PORT, reuse_address=True, backlog=1024)
+    print(f"[SERVER] Listening on {HOST}:{PORT} (asyncio)")
+    # các phòng tạo trước khi loop chạy (phòng mặc định) được khởi động tại đây
+    for room in list(rooms.values()):
+        event_loop.create_task(room.run_async())
+    async with server:
+        await server.serve_forever()
+
+def start_async_server():
+    asyncio.run(serve_async())
+
+_drawn_version = None
+_drawn_layout = None
+
+def refresh_display():
+    # chạy trên luồng Tk: chụp bản copy (copy-on-write) rồi vẽ ngoài khóa
+    global _drawn_version, _drawn_layout
+    room = rooms[DEFAULT_ROOM]
+    with room.lock:
+        state = room.game.get_state().copy() if room.journal.version != _drawn_version else None
+        _drawn_version = room.journal.version
+    if state is not None:
+        if state.layout is not _drawn_layout:
+            # map mới (load_map): dựng lại canvas theo kích thước layout, như frontend/spectator.py
+            ui.initialize(state)
+            _drawn_layout = state.layout
+        ui.update(state)
+    ui.get_root().after(int(DISPLAY_INTERVAL * 1000), refresh_display)
 
 if __name__ == "__main__":
-    threading.Thread(target=start_server, daemon=True).start()
-    threading.Thread(target=game_loop, daemon=True).start()
-    ui.mainloop()
+    # --headless (hoặc PACMAN_HEADLESS=1): không import Tk, không display; xem ván bằng frontend/spectator.py
+    if not (HEADLESS or "--headless" in sys.argv[1:]):
+        from ui.tkinter_ui import TkinterDisplay
+        ui = TkinterDisplay(zoom=1.5, frame_time=0.001)
+
+    # Tk chỉ vẽ phòng mặc định, trên luồng Tk theo nhịp riêng; các phòng khác chạy không display
+    if SERVER_MODE == SERVER_MODE_ASYNCIO:
+        create_room(DEFAULT_ROOM, display=ui, record_dir=RECORD_DIR, start=False)
+        serve = start_async_server
+    else:
+        create_room(DEFAULT_ROOM, display=ui, record_dir=RECORD_DIR)
+        serve = start_server
+
+    if METRICS_FILE:
+        threading.Thread(target=dump_metrics_loop, args=(METRICS_FILE, METRICS_INTERVAL), daemon=True).start()
+
+    if ui is None:
+        serve()
+    else:
+        threading.Thread(target=serve, daemon=True).start()
+        refresh_display()
+        ui.mainloop()
@@ -0,0 +1,314 @@
+import threading
+import time
+
+from pacman_game import PacmanGame
+from tick_scheduler import TickScheduler
+from metrics import Metrics
+from config.backend_config import (
+    NUM_AGENTS, TICK_MODE, TICK_MODE_TURN, TICK_MODE_JOINT, RECORD_KEYFRAME_INTERVAL,
+    AGENT_DEADLINE, AGENT_DEADLINES, DEFAULT_ACTION, MIN_TICK_INTERVAL
+)
+from envs.game_state import serialize_state
+from envs.layout_registry import get_registry
+from envs.state_delta import StateJournal, serialize_delta
+from envs.shm_transport import SharedStatePublisher
+from envs import wire_protocol as wire
+
+
+class GameRoom:
+    """Một ván độc lập trong backend: map, agent, lịch tick, pause và subscriber riêng.
+
+    notify(conn, room) báo cho server là kết nối có state mới ở phòng này; writer của kết nối
+    sau đó lấy payload qua state_for / delivered. Kết nối đã đóng (OSError) bị gỡ khỏi subscriber.
+    shm_name: nếu có, state còn được publish vào shared memory cho worker cùng máy.
+    """
+
+    def __init__(self, room_id: str, map_name: str, notify, display=None, tick_mode: str = TICK_MODE,
+                 num_agents: int = NUM_AGENTS, record_dir: str = None, render_in_tick: bool = True,
+                 shm_name: str = None):
+        if tick_mode not in (TICK_MODE_TURN, TICK_MODE_JOINT):
+            raise ValueError(f"unknown tick mode '{tick_mode}' (expected '{TICK_MODE_TURN}' or '{TICK_MODE_JOINT}')")
+        self.room_id = room_id
+        self.notify = notify
+        self.game = PacmanGame(map_name, display=display, record_dir=record_dir,
+                               keyframe_interval=RECORD_KEYFRAME_INTERVAL)
+        self.render_in_tick = render_in_tick
+        self.num_agents = num_agents
+        self.joint_mode = tick_mode == TICK_MODE_JOINT
+        self.tick_mode = tick_mode
+        self.current_turn_agent = 0
+        self.tick = 0
+        self.last_executed = {}
+        self.paused = False
+        self.closed = False
+        self.lock = threading.Lock()
+        self.clients_lock = threading.Lock()
+        # conn -> {"agent": agent_idx | None, "delta": bool, "binary": bool, "version": version đã gửi}
+        self.subscribers = {}
+        self.metrics = Metrics()
+        self._last_step = None
+        self.scheduler = TickScheduler(AGENT_DEADLINE, MIN_TICK_INTERVAL, DEFAULT_ACTION, AGENT_DEADLINES,
+                                       metrics=self.metrics)
+        self.journal = StateJournal()
+        self.journal.reset(self.game.get_state())
+        # (since, binary) -> bytes đã encode cho tick hiện tại; xóa khi state đổi
+        self._payloads = {}
+        self._generation = 0
+        self._encode_lock = threading.Lock()
+        self.publisher = None
+        if shm_name:
+            self.publisher = SharedStatePublisher(shm_name, self.game.get_state(), self.num_agents)
+            self.publish()
+            self.publisher.start_polling(self.submit_at)
+
+    def expected_agents(self):
+        return range(self.num_agents) if self.joint_mode else (self.current_turn_agent,)
+
+    def submit(self, agent_idx, action):
+        if isinstance(action, list) and len(action) > 0:
+            action = action[0]
+        return self.scheduler.submit(agent_idx, action)
+
+    def submit_at(self, agent_idx, action, tick):
+        # action từ ring shared memory mang theo tick: bỏ action cho tick đã qua
+        if tick != self.tick:
+            return False
+        return self.submit(agent_idx, action)
+
+    def publish(self):
+        # gọi khi đang giữ self.lock, sau open_tick để worker đọc state là có thể gửi action ngay
+        if self.publisher is not None:
+            with self.metrics.timer("shm_publish"):
+                self.publisher.publish(self.game.get_state(), self.journal.version, self.tick,
+                                       None if self.joint_mode else self.current_turn_agent, self.joint_mode)
+
+    def step(self, actions):
+        game = self.game
+        start = time.perf_counter()
+        if self._last_step is not None:
+            # khoảng cách giữa hai tick liên tiếp (gồm cả thời gian chờ agent): 1 / throughput
+            self.metrics.observe("tick_interval", start - self._last_step)
+        self._last_step = start
+        with self.lock:
+            if self.joint_mode:
+                if game.apply_joint_action(actions):
+                    self.last_executed.update(actions)
+            else:
+                action = actions.get(self.current_turn_agent)
+                if action is not None and game.apply_action(self.current_turn_agent, action):
+                    self.last_executed[self.current_turn_agent] = action
+            if game.display and self.render_in_tick:
+                game.display.update(game.get_state())
+            self.journal.commit(game.get_state())
+            self.tick += 1
+            if not self.joint_mode:
+                self.current_turn_agent = (self.current_turn_agent + 1) % self.num_agents
+            self.scheduler.open_tick(self.expected_agents())
+            self._invalidate()
+            self.publish()
+        self.metrics.inc("ticks")
+        self.metrics.observe("tick_duration", time.perf_counter() - start)
+
+    def load_map(self, map_name) -> bool:
+        try:
+            num_ghosts = get_registry().get_initial_state(map_name).num_ghosts()
+        except (KeyError, TypeError):
+            print(f"[ROOM {self.room_id}] Unknown map: {map_name}")
+            return False
+        if num_ghosts < self.num_agents - 1:
+            print(f"[ROOM {self.room_id}] Map {map_name} has {num_ghosts} ghosts, room needs {self.num_agents - 1}")
+            return False
+        with self.lock:
+            if self.closed:
+                # phòng đã đóng: không mở file replay mới
+                return False
+            self.game.reset(map_name)
+            self.journal.reset(self.game.get_state())
+            self.current_turn_agent = 0
+            self.last_executed.clear()
+            self.scheduler.open_tick(self.expected_agents())
+            self._invalidate()
+            self.publish()
+        self.push_state()
+        return True
+
+    def set_paused(self, value: bool):
+        self.paused = value
+        self.game.set_pause(value)
+        self.scheduler.set_paused(value)
+
+    def state_payload(self, since=None, binary=False) -> bytes:
+        """Bytes của message state (hoặc state_delta nếu client có version since đủ mới).
+
+        Mỗi (since, giao thức) chỉ encode một lần mỗi tick, mọi client sau nhận lại cùng buffer;
+        khóa chỉ giữ để tra cache hoặc chụp bản copy (copy-on-write), encode chạy ngoài khóa.
+        """
+        return self._cached_payload(since, binary)[0]
+
+    def _cached_payload(self, since, binary):
+        # -> (bytes, version, tick, agent được chờ) của cùng một tick
+        key = (since, binary)
+        with self.lock:
+            entry = self._lookup(key)
+        if entry is not None:
+            return entry
+        # writer của nhiều kết nối cùng trượt cache: chỉ một thread encode, các thread khác chờ rồi dùng lại
+        with self._encode_lock:
+            with self.lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry
+                cells = self.journal.changed_cells(since) if since is not None else None
+                if cells is None:
+                    # client quá cũ cũng nhận snapshot đầy đủ dùng chung
+                    entry = self._lookup((None, binary))
+                    if entry is not None:
+                        self._payloads[key] = entry
+                        return entry
+                generation = self._generation
+                info = (self.journal.version, self.tick, frozenset(self.expected_agents()))
+                snapshot = (self.game.get_state().copy(), cells, since, self.journal.version,
+                            self.tick, self.current_turn_agent, self.joint_mode)
+            start = time.perf_counter()
+            entry = (self._encode_state(binary, *snapshot),) + info
+            self.metrics.observe("serialize.binary" if binary else "serialize.json", time.perf_counter() - start)
+            with self.lock:
+                if generation == self._generation:
+                    self._payloads[key] = entry
+                    if cells is None:
+                        self._payloads.setdefault((None, binary), entry)
+        return entry
+
+    def _lookup(self, key):
+        # gọi khi đang giữ self.lock
+        entry = self._payloads.get(key)
+        if entry is not None:
+            self.metrics.inc("serialize_cache_hits")
+        return entry
+
+    def _encode_state(self, binary, state, cells, since, version, tick, current_turn, joint) -> bytes:
+        if binary:
+            if cells is None:
+                return wire.encode_state_msg(state, version, tick, current_turn, joint)
+            return wire.encode_delta_msg(state, cells, since, version, tick, current_turn, joint)
+
+        msg = {
+            "type": "state",
+            "room": self.room_id,
+            "version": version,
+            "current_turn": current_turn,
+            "tick": tick,
+            "joint": joint
+        }
+        if cells is None:
+            msg["state"] = serialize_state(state)
+        else:
+            msg.update(type="state_delta", since=since, delta=serialize_delta(state, cells))
+        return wire.encode_line(msg)
+
+    def _invalidate(self):
+        # gọi khi đang giữ self.lock mỗi khi state / tick đổi
+        self._generation += 1
+        self._payloads.clear()
+
+    def your_turn_payload(self, agent_idx, tick, binary=False) -> bytes:
+        if binary:
+            return wire.encode_your_turn(agent_idx, tick)
+        return wire.encode_line({"type": "your_turn", "room": self.room_id, "agent": agent_idx, "tick": tick})
+
+    def subscribe(self, conn, agent_idx=None, delta=False, binary=False):
+        with self.clients_lock:
+            self.subscribers[conn] = {"agent": agent_idx, "delta": bool(delta), "binary": binary, "version": None}
+        self.push_state([conn])
+
+    def unsubscribe(self, conn):
+        with self.clients_lock:
+            return self.subscribers.pop(conn, None) is not None
+
+    def resync(self, conn) -> bool:
+        # mirror phía client lệch version: gửi lại snapshot đầy đủ
+        with self.clients_lock:
+            sub = self.subscribers.get(conn)
+            if sub is None:
+                return False
+            sub["version"] = None
+        self.push_state([conn])
+        return True
+
+    def push_state(self, conns=None):
+        # chỉ đánh dấu: không encode, không ghi socket trên thread tick
+        with self.clients_lock:
+            targets = [c for c in self.subscribers if conns is None or c in conns]
+        start = time.perf_counter()
+        for conn in targets:
+            try:
+                self.notify(conn, self)
+            except OSError:
+                self.unsubscribe(conn)
+        self.metrics.observe("push_state", time.perf_counter() - start)
+
+    def state_for(self, conn):
+        """-> (chunks, version) mới nhất cho subscriber conn, tính từ version nó đã nhận;
+        (None, None) nếu conn không còn subscribe. Gọi từ writer của kết nối.
+
+        chunks là tuple buffer ghi liên tiếp: buffer state dùng chung (không copy) và your_turn nếu tới lượt.
+        """
+        with self.clients_lock:
+            sub = self.subscribers.get(conn)
+        if sub is None:
+            return None, None
+        payload, version, tick, expected = self._cached_payload(sub["version"] if sub["delta"] else None, sub["binary"])
+        if sub["agent"] in expected:
+            return (payload, self.your_turn_payload(sub["agent"], tick, sub["binary"])), version
+        return (payload,), version
+
+    def delivered(self, conn, version):
+        # payload đã ghi ra socket: delta lần sau tính từ version này
+        sub = self.subscribers.get(conn)
+        if sub is not None:
+            sub["version"] = version
+
+    def status(self) -> dict:
+        return {
+            "room": self.room_id,
+            "map": self.game.map_file,
+            "last_executed": self.last_executed,
+            "paused": self.paused,
+            "tick_mode": self.tick_mode,
+            "tick": self.tick,
+            "subscribers": len(self.subscribers),
+            "shm": self.publisher.name if self.publisher is not None else None,
+            "overruns": dict(self.scheduler.overruns)
+        }
+
+    def close(self):
+        # đánh thức vòng tick để nó thoát
+        self.closed = True
+        self.scheduler.set_paused(False)
+        self.scheduler.open_tick(())
+        with self.lock:
+            # cùng khóa với step: thread tick có thể đang ghi replay dở
+            self.game.stop_recording()
+            if self.publisher is not None:
+                self.publisher.close()
+                self.publisher = None
+
+    def run(self):
+        with self.lock:
+            self.scheduler.open_tick(self.expected_agents())
+        while not self.closed:
+            actions = self.scheduler.collect()
+            if self.closed:
+                break
+            self.step(actions)
+            self.push_state()
+
+    async def run_async(self):
+        with self.lock:
+            self.scheduler.open_tick(self.expected_agents())
+        while not self.closed:
+            actions = await self.scheduler.collect_async()
+            if self.closed:
+                break
+            self.step(actions)
+            self.push_state()
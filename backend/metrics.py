@@ -0,0 +1,100 @@
+import math
+import threading
+import time
+
+# bucket histogram theo lũy thừa 2 từ 1 µs: bucket i chứa giá trị <= 1µs * 2^i (bucket cuối: còn lại)
+_BASE = 1e-6
+_NUM_BUCKETS = 28
+
+
+class Histogram:
+    """Histogram log2 cố định: ghi O(1), không giữ mẫu; percentile là cận trên của bucket."""
+
+    def __init__(self):
+        self.buckets = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float):
+        idx = 0 if value <= _BASE else min(_NUM_BUCKETS - 1, math.ceil(math.log2(value / _BASE)))
+        self.buckets[idx] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(self.max, _BASE * 2 ** i)
+        return self.max
+
+    def snapshot(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99)
+        }
+
+
+class Metrics:
+    """Bộ đếm + histogram thời gian (giây) theo tên, an toàn giữa các thread.
+
+    Tên có nhãn dùng dạng "tên.nhãn", vd "action_latency.0" cho agent 0.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(value)
+
+    def timer(self, name: str):
+        return _Timer(self, name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime": time.monotonic() - self._started,
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in self.histograms.items()}
+            }
+
+
+class _Timer:
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
@@ -0,0 +1,226 @@
+import asyncio
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+class SlowClientError(ConnectionResetError):
+    """Client đọc quá chậm: hàng đợi gửi đầy hoặc ghi bị nghẽn quá lâu."""
+
+
+class _Outbox(ABC):
+    """Phần chung: message điều khiển xếp hàng có giới hạn; state chỉ là cờ "có state mới" theo phòng.
+
+    Khi tới lượt ghi state, writer hỏi phòng payload mới nhất tính từ version client đã thật sự
+    nhận (room.state_for), nên các state cũ chồng lên nhau tự gộp thành một và delta luôn liền mạch.
+    """
+
+    def __init__(self, key, max_messages: int, metrics=None):
+        self.key = key
+        self.max_messages = max_messages
+        self.metrics = metrics
+        self.closed = False
+        self._queue = deque()
+        self._states = {}  # room -> True, giữ thứ tự phòng được báo
+
+    def _count(self, name: str, n: int = 1):
+        if self.metrics is not None:
+            self.metrics.inc(name, n)
+
+    def _check_queue(self):
+        if self.closed:
+            raise ConnectionResetError("client disconnected")
+        if len(self._queue) >= self.max_messages:
+            self._count("slow_disconnects")
+            self._abort(f"outbound queue full ({self.max_messages} messages)")
+            raise SlowClientError("outbound queue full")
+
+    def _pop_room(self):
+        # phòng được báo sớm nhất, hoặc None; ThreadedOutbox gọi khi đang giữ _cond
+        if not self._states:
+            return None
+        room = next(iter(self._states))
+        del self._states[room]
+        return room
+
+    @abstractmethod
+    def _abort(self, reason: str) -> None:
+        """Ngắt kết nối ngay (client chậm); phiên được đóng ở đường đọc của kết nối."""
+        pass
+
+
+class ThreadedOutbox(_Outbox):
+    """Server threaded: một writer thread mỗi kết nối, thread tick / reader không bao giờ chặn trên socket.
+
+    sendall có timeout stall_timeout (tổng thời gian một lần ghi); quá hạn thì ngắt kết nối.
+    """
+
+    def __init__(self, conn: socket.socket, max_messages: int, stall_timeout: float, metrics=None):
+        super().__init__(conn, max_messages, metrics)
+        self.conn = conn
+        self.stall_timeout = stall_timeout
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def put(self, data: bytes):
+        with self._cond:
+            self._check_queue()
+            self._queue.append(data)
+            self._cond.notify()
+
+    def mark_state(self, room):
+        with self._cond:
+            if self.closed:
+                raise ConnectionResetError("client disconnected")
+            if room in self._states:
+                self._count("coalesced_states")
+            self._states[room] = True
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def _abort(self, reason: str):
+        # gọi khi đang giữ _cond; shutdown làm recv của reader thread trả về, phiên được đóng ở đó
+        print(f"[SERVER] Dropping slow client: {reason}")
+        self.closed = True
+        self._cond.notify()
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _run(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            # lỗi không lường trước (encode state, ...): không để phiên treo với writer đã chết
+            with self._cond:
+                self._abort(f"writer failed: {e!r}")
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not (self.closed or self._queue or self._states):
+                    self._cond.wait()
+                if self.closed:
+                    return
+                chunks = (self._queue.popleft(),) if self._queue else None
+                room = self._pop_room() if chunks is None else None
+            version = None
+            if room is not None:
+                # encode ngoài khóa: thread tick / reader vẫn mark_state, put được trong lúc này
+                chunks, version = room.state_for(self.key)
+                if chunks is None:
+                    continue
+            try:
+                self._send(chunks)
+            except socket.timeout:
+                with self._cond:
+                    self._count("slow_disconnects")
+                    self._abort(f"write stalled for more than {self.stall_timeout}s")
+                return
+            except OSError:
+                self.close()
+                return
+            self._count("messages_out", len(chunks))
+            self._count("bytes_out", sum(map(len, chunks)))
+            if room is not None:
+                room.delivered(self.key, version)
+
+    def _send(self, chunks):
+        # scatter-gather: state dùng chung + your_turn trong một syscall, không nối buffer
+        if len(chunks) == 1:
+            self.conn.sendall(chunks[0])
+            return
+        sent = self.conn.sendmsg(chunks)
+        for chunk in chunks:
+            if sent >= len(chunk):
+                sent -= len(chunk)
+                continue
+            self.conn.sendall(memoryview(chunk)[sent:])
+            sent = 0
+
+
+class TransportOutbox(_Outbox):
+    """Server asyncio: ghi thẳng vào transport; khi buffer vượt high water (pause_writing) thì state
+    chỉ được đánh dấu và gửi bản mới nhất khi resume_writing. Mọi lời gọi chạy trên event loop.
+    """
+
+    def __init__(self, key, transport, max_messages: int, stall_timeout: float,
+                 high_water: int, metrics=None):
+        super().__init__(key, max_messages, metrics)
+        self.transport = transport
+        self.stall_timeout = stall_timeout
+        self.paused = False
+        self._stall = None
+        self._loop = asyncio.get_running_loop()
+        transport.set_write_buffer_limits(high=high_water)
+
+    def put(self, data: bytes):
+        if self.paused:
+            # đang nghẽn: giữ lại theo thứ tự, có giới hạn
+            self._check_queue()
+            self._queue.append(data)
+            return
+        if self.closed:
+            raise ConnectionResetError("client disconnected")
+        self._write(data)
+
+    def mark_state(self, room):
+        if self.closed:
+            raise ConnectionResetError("client disconnected")
+        if room in self._states:
+            self._count("coalesced_states")
+        self._states[room] = True
+        self._flush()
+
+    def pause_writing(self):
+        self.paused = True
+        self._stall = self._loop.call_later(self.stall_timeout, self._stalled)
+
+    def resume_writing(self):
+        self.paused = False
+        if self._stall is not None:
+            self._stall.cancel()
+            self._stall = None
+        self._flush()
+
+    def close(self):
+        self.closed = True
+        if self._stall is not None:
+            self._stall.cancel()
+            self._stall = None
+
+    def _stalled(self):
+        self._stall = None
+        self._count("slow_disconnects")
+        self._abort(f"write stalled for more than {self.stall_timeout}s")
+
+    def _abort(self, reason: str):
+        print(f"[SERVER] Dropping slow client: {reason}")
+        self.close()
+        self.transport.abort()
+
+    def _write(self, data: bytes):
+        self.transport.write(data)
+        self._count("messages_out")
+        self._count("bytes_out", len(data))
+
+    def _flush(self):
+        while not self.paused and not self.closed:
+            if self._queue:
+                self._write(self._queue.popleft())
+                continue
+            room = self._pop_room()
+            if room is None:
+                return
+            chunks, version = room.state_for(self.key)
+            if chunks is not None:
+                # write từng buffer: buffer rỗng thì transport gửi thẳng, không nối bytes
+                for chunk in chunks:
+                    self._write(chunk)
+                room.delivered(self.key, version)
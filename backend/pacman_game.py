@@ -1,56 +1,58 @@
-import numpy as np
-from envs.game_state import GameState, AgentInfo, GhostInfo
+from envs.game_state import GameState
 from envs.game_engine import GameEngine 
-from envs import layouts
+from envs.layout_registry import get_registry
+from envs.replay import GameRecorder, DEFAULT_KEYFRAME_INTERVAL
 from ui.renderers import BaseDisplay
+import os
+import time
 
 class PacmanGame:
-    def __init__(self, map_file: str, display: BaseDisplay = None):
+    def __init__(self, map_file: str, display: BaseDisplay = None, record_dir: str = None,
+                 seeds: dict = None, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        # map_file: tên layout trong maps/ (vd "mediumClassic") hoặc đường dẫn file .map
+        # record_dir: nếu có, mỗi ván được ghi thành một file replay .pmr trong thư mục này
         self.map_file = map_file
         self.state = self.load_map(map_file)
-        self.state_size = self.state.object_matrix.shape
+        self.state_size = self.state.shape
         self.last_actions = {}
         self.display = display
         self.paused = False
+        self.record_dir = record_dir
+        self.seeds = seeds
+        self.keyframe_interval = keyframe_interval
+        self.recorder = None
+        self._games = 0
+        self.start_recording()
 
         if self.display:
             self.display.initialize(self.state)
 
     def load_map(self, file_path: str) -> GameState:
-        with open(file_path, "r") as f:
-            lines = [line.rstrip("\n") for line in f if line.strip()]
+        return get_registry().new_state(file_path)
 
-        H, W = len(lines), len(lines[0])
-        object_matrix = np.zeros((H, W), dtype=int)
-        pacman = None
-        ghosts = []
+    def start_recording(self):
+        self.stop_recording()
+        if not self.record_dir:
+            return
+        self._games += 1
+        stem = os.path.splitext(os.path.basename(self.map_file))[0]
+        path = os.path.join(self.record_dir, f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._games}.pmr")
+        self.recorder = GameRecorder(path, self.state, map_name=self.map_file,
+                                     seeds=self.seeds, keyframe_interval=self.keyframe_interval)
 
-        for y, line in enumerate(lines):
-            for x, ch in enumerate(line):
-                if ch == '%':
-                    object_matrix[y, x] = layouts.WALL
-                elif ch == '.':
-                    object_matrix[y, x] = layouts.FOOD
-                elif ch == 'o':
-                    object_matrix[y, x] = layouts.CAPSULE
-                elif ch == 'P':
-                    object_matrix[y, x] = layouts.PACMAN
-                    pacman = AgentInfo(x=x, y=y, dir="East")
-                elif ch == 'G':
-                    ghost_id = len(ghosts)
-                    object_matrix[y, x] = getattr(layouts, f"GHOST{ghost_id+1}", layouts.GHOST1)
-                    ghosts.append(GhostInfo(x=x, y=y, dir="East", scared_timer=0))
-                else:
-                    object_matrix[y, x] = layouts.EMPTY
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
-        return GameState(
-            object_matrix=object_matrix,
-            pacman=pacman,
-            ghosts=ghosts,
-            score=0.0,
-            win=False,
-            lose=False
-        )
+    def reset(self, map_file: str = None):
+        if map_file is not None:
+            self.map_file = map_file
+        self.state = self.load_map(self.map_file)
+        self.state_size = self.state.shape
+        self.last_actions = {}
+        # không vẽ ở đây: reset chạy trên luồng mạng; chủ display (luồng Tk) tự initialize lại khi layout đổi
+        self.start_recording()
 
     def get_state(self) -> GameState:
         return self.state
@@ -69,6 +71,21 @@ class PacmanGame:
             return False
         self.last_actions[agent_idx] = action
         GameEngine.apply_action(self.state, agent_idx, action)
+        if self.recorder is not None:
+            self.recorder.record_action(agent_idx, action, self.state)
+            if self.state.win or self.state.lose:
+                self.stop_recording()
+        return True
+
+    def apply_joint_action(self, actions: dict):
+        if self.paused:
+            return False
+        self.last_actions.update(actions)
+        GameEngine.apply_joint_action(self.state, actions)
+        if self.recorder is not None:
+            self.recorder.record_joint_action(actions, self.state)
+            if self.state.win or self.state.lose:
+                self.stop_recording()
         return True
 
     def draw_ui_tick(self):
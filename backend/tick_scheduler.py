@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+DEFAULT_ACTION_LAST = "last"
+
+
+class TickScheduler:
+    """Lockstep theo sự kiện: tick chạy ngay khi mọi agent được chờ đã gửi action.
+
+    Mỗi agent có deadline riêng (giây, tính từ lúc mở tick; <= 0 là chờ mãi);
+    quá hạn thì dùng default_action ("Stop" hoặc "last" = lặp action trước đó)
+    và tăng bộ đếm overrun. min_interval > 0 giữ nhịp tối thiểu cho chơi
+    real-time; min_interval = 0 là chế độ max speed.
+    metrics (tùy chọn): ghi độ trễ action theo agent, lượt bị lỡ và action bị từ chối.
+    """
+
+    def __init__(self, deadline: float, min_interval: float = 0.0,
+                 default_action: str = "Stop", agent_deadlines: dict = None, metrics=None):
+        self.deadline = deadline
+        self.agent_deadlines = dict(agent_deadlines or {})
+        self.min_interval = min_interval
+        self.default_action = default_action
+        self.overruns = {}
+        self.metrics = metrics
+        self.expected = set()
+        self.pending = {}
+        self._timed_out = set()
+        self.paused = False
+        self._last = {}
+        self._opened = time.monotonic()
+        self._cond = threading.Condition()
+        # collect_async đang chờ: (event loop, asyncio.Event)
+        self._waiter = None
+
+    def deadline_for(self, agent_idx: int) -> float:
+        return self.agent_deadlines.get(agent_idx, self.deadline)
+
+    def open_tick(self, expected):
+        with self._cond:
+            self.expected = set(expected)
+            self.pending = {}
+            self._timed_out = set()
+            self._opened = time.monotonic()
+            self._notify()
+
+    def set_paused(self, value: bool):
+        with self._cond:
+            self.paused = value
+            if not value:
+                self._opened = time.monotonic()
+            self._notify()
+
+    def submit(self, agent_idx: int, action) -> bool:
+        with self._cond:
+            if self.paused or agent_idx not in self.expected or agent_idx in self._timed_out:
+                if self.metrics is not None:
+                    self.metrics.inc("rejected_actions")
+                return False
+            if self.metrics is not None:
+                # thời gian từ lúc mở tick tới khi action của agent tới
+                self.metrics.observe(f"action_latency.{agent_idx}", time.monotonic() - self._opened)
+            self.pending[agent_idx] = action
+            self._last[agent_idx] = action
+            if self.expected.issubset(self.pending):
+                self._notify()
+            return True
+
+    def _notify(self):
+        # gọi khi đang giữ _cond
+        self._cond.notify_all()
+        if self._waiter is not None:
+            loop, event = self._waiter
+            loop.call_soon_threadsafe(event.set)
+
+    def _default(self, agent_idx: int):
+        if self.default_action == DEFAULT_ACTION_LAST:
+            return self._last.get(agent_idx, "Stop")
+        return self.default_action
+
+    def _expire(self):
+        """Áp dụng action mặc định cho agent quá hạn; trả về thời điểm hạn kế tiếp
+        (inf nếu có agent chờ vô hạn / đang pause) hoặc None khi tick đã đủ action."""
+        if self.paused:
+            return float("inf")
+        now = time.monotonic()
+        next_due = None
+        for agent_idx in self.expected.difference(self.pending):
+            limit = self.deadline_for(agent_idx)
+            if limit <= 0:
+                next_due = float("inf")
+                continue
+            due = self._opened + limit
+            if due <= now:
+                # quá hạn: áp dụng action mặc định, action đến sau bị bỏ
+                self.overruns[agent_idx] = self.overruns.get(agent_idx, 0) + 1
+                if self.metrics is not None:
+                    self.metrics.inc(f"missed_turns.{agent_idx}")
+                self.pending[agent_idx] = self._default(agent_idx)
+                self._timed_out.add(agent_idx)
+            elif next_due is None or due < next_due:
+                next_due = due
+        return next_due
+
+    def _finish(self):
+        actions = dict(self.pending)
+        self.expected = set()
+        self.pending = {}
+        return actions, self._opened + self.min_interval - time.monotonic()
+
+    def collect(self) -> dict:
+        """Chờ đủ action hoặc hết deadline, trả về {agent_idx: action} cho mọi agent được chờ."""
+        with self._cond:
+            while True:
+                next_due = self._expire()
+                if next_due is None:
+                    break
+                self._cond.wait(None if next_due == float("inf") else next_due - time.monotonic())
+            actions, wait = self._finish()
+
+        if wait > 0:
+            time.sleep(wait)
+        return actions
+
+    async def collect_async(self) -> dict:
+        """Như collect() nhưng chờ trên event loop (server asyncio)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                next_due = self._expire()
+                if next_due is None:
+                    actions, wait = self._finish()
+                    self._waiter = None
+                    break
+                event = asyncio.Event()
+                self._waiter = (loop, event)
+            timeout = None if next_due == float("inf") else max(0.0, next_due - time.monotonic())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return actions
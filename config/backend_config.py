@@ -0,0 +1,44 @@
+import os
+
+NUM_AGENTS = 3
+TICK_INTERVAL = 0.05
+
+# "turn": mỗi tick một agent (round-robin); "joint": mỗi tick cả vòng Pacman + ghost
+TICK_MODE_TURN = "turn"
+TICK_MODE_JOINT = "joint"
+TICK_MODE = os.environ.get("PACMAN_TICK_MODE", TICK_MODE_TURN)
+
+# lockstep: tick chạy ngay khi đủ action; agent chậm quá AGENT_DEADLINE giây nhận DEFAULT_ACTION
+AGENT_DEADLINE = float(os.environ.get("PACMAN_AGENT_DEADLINE", "0.1"))
+AGENT_DEADLINES = {}  # {agent_idx: giây} ghi đè deadline cho từng agent
+DEFAULT_ACTION = os.environ.get("PACMAN_DEFAULT_ACTION", "Stop")  # "Stop" hoặc "last"
+# max speed: không giữ nhịp TICK_INTERVAL, chạy nhanh nhất agent trả lời được
+MAX_SPEED = os.environ.get("PACMAN_MAX_SPEED", "0") == "1"
+MIN_TICK_INTERVAL = 0.0 if MAX_SPEED else TICK_INTERVAL
+
+# ghi replay mỗi ván vào thư mục này (để trống = không ghi)
+RECORD_DIR = os.environ.get("PACMAN_RECORD_DIR", "")
+RECORD_KEYFRAME_INTERVAL = 100
+
+# "threaded": một thread cho mỗi kết nối; "asyncio": mọi kết nối + tick chạy trên một event loop
+SERVER_MODE_THREADED = "threaded"
+SERVER_MODE_ASYNCIO = "asyncio"
+SERVER_MODE = os.environ.get("PACMAN_SERVER_MODE", SERVER_MODE_THREADED)
+DISPLAY_INTERVAL = TICK_INTERVAL  # nhịp vẽ Tk khi display tách khỏi vòng tick
+
+# nhiều phòng (ván độc lập) trong một process; client không ghi "room" sẽ vào phòng mặc định
+DEFAULT_ROOM = os.environ.get("PACMAN_DEFAULT_ROOM", "default")
+MAX_ROOMS = int(os.environ.get("PACMAN_MAX_ROOMS", "64"))
+
+# headless: backend không import Tk, không vẽ; người xem chạy frontend/spectator.py riêng
+HEADLESS = os.environ.get("PACMAN_HEADLESS", "0") == "1"
+
+# ghi get_metrics định kỳ (JSON mỗi dòng) vào file này; để trống = tắt
+METRICS_FILE = os.environ.get("PACMAN_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("PACMAN_METRICS_INTERVAL", "10"))
+
+# hàng đợi gửi mỗi kết nối: state luôn gộp thành bản mới nhất; message điều khiển tối đa
+# OUTBOX_MAX_MESSAGES, ghi nghẽn quá SLOW_CLIENT_TIMEOUT giây thì ngắt client
+OUTBOX_MAX_MESSAGES = int(os.environ.get("PACMAN_OUTBOX_MAX_MESSAGES", "256"))
+SLOW_CLIENT_TIMEOUT = float(os.environ.get("PACMAN_SLOW_CLIENT_TIMEOUT", "5"))
+WRITE_HIGH_WATER = 256 * 1024  # asyncio: byte chờ trong transport trước khi coi là nghẽn
@@ -0,0 +1,9 @@
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.environ.get("PACMAN_CACHE_DIR", os.path.join(PROJECT_ROOT, "cache"))
+DISTANCE_CACHE_DIR = os.path.join(CACHE_DIR, "distances")
+
+# giới hạn số ô đi được cho bảng khoảng cách mọi cặp (3 * N^2 byte trên đĩa / bộ nhớ);
+# đo được: 3600 ô dựng ~1.5s (39 MB), 7400 ô ~7s (164 MB)
+MAX_DISTANCE_CELLS = 4096
@@ -1,2 +1,11 @@
+import os
+
 HOST = "127.0.0.1"
-PORT = 50008
\ No newline at end of file
+PORT = 50008
+# giao thức của worker: "binary" (frame có độ dài) hoặc "json" (dòng JSON, dễ debug)
+PROTOCOL = os.environ.get("PACMAN_PROTOCOL", "binary")
+# đường truyền state/action của worker chạy cùng máy: "tcp" hoặc "shm" (shared memory,
+# backend vẫn mở TCP cho client khác)
+TRANSPORT_TCP = "tcp"
+TRANSPORT_SHM = "shm"
+TRANSPORT = os.environ.get("PACMAN_TRANSPORT", TRANSPORT_TCP)
@@ -0,0 +1,41 @@
+# bitplane.py
+# -------------------------
+# Mặt phẳng bit nén (1 bit / ô) cho food và capsule
+# -------------------------
+import numpy as np
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def pack(mask: np.ndarray) -> np.ndarray:
+    return np.packbits(np.asarray(mask, dtype=bool).ravel())
+
+
+def unpack(bits: np.ndarray, shape) -> np.ndarray:
+    H, W = shape
+    return np.unpackbits(bits, count=H * W).reshape(H, W).astype(bool)
+
+
+def test(bits: np.ndarray, idx: int) -> bool:
+    return bool((int(bits[idx >> 3]) >> (7 - (idx & 7))) & 1)
+
+
+def test_many(bits: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    idx = np.asarray(idx, dtype=np.int64)
+    return ((bits[idx >> 3] >> (7 - (idx & 7)).astype(np.uint8)) & 1).astype(bool)
+
+
+def clear(bits: np.ndarray, idx: int) -> None:
+    bits[idx >> 3] &= np.uint8(~(0x80 >> (idx & 7)) & 0xFF)
+
+
+def set_bit(bits: np.ndarray, idx: int) -> None:
+    bits[idx >> 3] |= np.uint8(0x80 >> (idx & 7))
+
+
+def popcount(bits: np.ndarray) -> int:
+    return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+
+def indices(bits: np.ndarray, size: int) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(bits, count=size))
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+import numpy as np
+
+from envs.static_layout import StaticLayout
+from envs.topology import DIRECTION_ORDER
+from config.cache_config import DISTANCE_CACHE_DIR, MAX_DISTANCE_CELLS
+
+UNREACHABLE = np.iinfo(np.uint16).max
+NO_ACTION = 255
+_BFS_BATCH = 256    # số nguồn BFS mỗi lô: giới hạn kích thước frontier
+
+_memory_cache = {}      # walls_key -> MazeDistances (layout cùng tường dùng chung bảng)
+_by_layout = {}         # StaticLayout.key -> MazeDistances hoặc None (map quá lớn)
+_build_locks = {}
+_cache_lock = threading.Lock()
+_MISSING = object()
+
+
+def walls_key(walls: np.ndarray) -> str:
+    digest = hashlib.sha1()
+    digest.update(np.asarray(walls.shape, dtype=np.int64).tobytes())
+    digest.update(np.packbits(walls.ravel()).tobytes())
+    return digest.hexdigest()
+
+
+class MazeDistances:
+    """Khoảng cách mê cung mọi cặp ô và hướng đi đầu tiên trên đường ngắn nhất."""
+
+    def __init__(self, layout: StaticLayout, dist: np.ndarray, next_hop: np.ndarray):
+        self.width = layout.width
+        self.dist = dist
+        self.next_hop = next_hop
+
+        open_cells = np.flatnonzero(~layout.walls.ravel()).astype(np.int32)
+        cell_ids = np.full(layout.size, -1, dtype=np.int32)
+        cell_ids[open_cells] = np.arange(open_cells.size, dtype=np.int32)
+        self.open_cells = open_cells
+        self.cell_ids = cell_ids
+
+    def _id(self, pos) -> int:
+        return int(self.cell_ids[int(pos[1]) * self.width + int(pos[0])])
+
+    def getDistance(self, pos1, pos2) -> float:
+        i, j = self._id(pos1), self._id(pos2)
+        if i < 0 or j < 0:
+            return float("inf")
+        d = self.dist[i, j]
+        return float("inf") if d == UNREACHABLE else int(d)
+
+    def getDistances(self, source, targets) -> np.ndarray:
+        """Khoảng cách từ source tới từng ô trong targets (mảng int, inf -> UNREACHABLE)."""
+        i = self._id(source)
+        if i < 0 or not len(targets):
+            return np.full(len(targets), UNREACHABLE, dtype=np.int64)
+        xy = np.asarray(list(targets), dtype=np.int64).reshape(-1, 2)
+        ids = self.cell_ids[xy[:, 1] * self.width + xy[:, 0]]
+        row = self.dist[i].astype(np.int64)
+        return np.where(ids >= 0, row[np.maximum(ids, 0)], UNREACHABLE)
+
+    def getNextAction(self, source, target):
+        i, j = self._id(source), self._id(target)
+        if i < 0 or j < 0:
+            return None
+        k = self.next_hop[i, j]
+        return None if k == NO_ACTION else DIRECTION_ORDER[k]
+
+
+def _bfs_rows(nbr: np.ndarray, sources: np.ndarray, N: int) -> np.ndarray:
+    # một BFS riêng cho mỗi nguồn trong lô, chạy song song; frontier thưa gồm các ô (hàng, ô)
+    # đánh chỉ số phẳng vào dist, nên tổng công việc là O(số nguồn * số cạnh)
+    dist = np.full((len(sources), N), UNREACHABLE, dtype=np.uint16)
+    flat_dist = dist.reshape(-1)
+    owner = np.empty(flat_dist.size, dtype=np.int32)  # khử trùng lặp O(F): phần tử ghi sau cùng thắng
+    frontier = np.arange(len(sources), dtype=np.int64) * N + sources
+    flat_dist[frontier] = 0
+    d = 0
+    while frontier.size:
+        d += 1
+        rows, cells = np.divmod(frontier, N)
+        cand = nbr[cells]
+        reached = (rows[:, None] * N + cand)[cand >= 0]
+        reached = reached[flat_dist[reached] == UNREACHABLE]
+        order = np.arange(reached.size, dtype=np.int32)
+        owner[reached] = order
+        reached = reached[owner[reached] == order]
+        flat_dist[reached] = d
+        frontier = reached
+    return dist
+
+
+def compute_tables(layout: StaticLayout):
+    walls = layout.walls
+    open_cells = np.flatnonzero(~walls.ravel())
+    N = open_cells.size
+    cell_ids = np.full(layout.size, -1, dtype=np.int64)
+    cell_ids[open_cells] = np.arange(N)
+
+    grid_nbr = layout.topology.neighbors[open_cells]
+    nbr = np.where(grid_nbr >= 0, cell_ids[np.maximum(grid_nbr, 0)], -1)
+
+    dist = np.empty((N, N), dtype=np.uint16)
+    for start in range(0, N, _BFS_BATCH):
+        sources = np.arange(start, min(start + _BFS_BATCH, N), dtype=np.int64)
+        dist[start:start + len(sources)] = _bfs_rows(nbr, sources, N)
+
+    # hướng đầu tiên: bước tới ô kề có khoảng cách tới đích nhỏ hơn đúng 1
+    next_hop = np.full((N, N), NO_ACTION, dtype=np.uint8)
+    dist32 = dist.astype(np.int32)
+    for k in range(len(DIRECTION_ORDER)):
+        valid = np.flatnonzero(nbr[:, k] >= 0)
+        if not valid.size:
+            continue
+        here = dist32[valid]
+        ok = (dist32[nbr[valid, k]] + 1 == here) & (here != UNREACHABLE) & (next_hop[valid] == NO_ACTION)
+        next_hop[valid] = np.where(ok, k, next_hop[valid])
+
+    return dist, next_hop
+
+
+def _load_or_build(layout: StaticLayout, key: str, cache_dir: str):
+    dist_path = os.path.join(cache_dir, f"{key}.dist.npy")
+    next_path = os.path.join(cache_dir, f"{key}.next.npy")
+
+    if not (os.path.isfile(dist_path) and os.path.isfile(next_path)):
+        dist, next_hop = compute_tables(layout)
+        os.makedirs(cache_dir, exist_ok=True)
+        for path, arr in ((dist_path, dist), (next_path, next_hop)):
+            tmp = f"{path[:-4]}.{os.getpid()}.tmp.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, path)
+
+    # mmap: mọi process worker dùng chung các trang của cùng một file
+    return np.load(dist_path, mmap_mode="r"), np.load(next_path, mmap_mode="r")
+
+
+def _build_lock(key: str) -> threading.Lock:
+    with _cache_lock:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def get_maze_distances(layout: StaticLayout, cache_dir: str = DISTANCE_CACHE_DIR):
+    """Bảng khoảng cách của layout, hoặc None nếu map có quá MAX_DISTANCE_CELLS ô đi được.
+
+    LayoutRegistry gọi khi nạp map nên lúc chơi chỉ còn một lần tra dict không khóa;
+    layout dựng lại ở worker (từ lưới nhận được) lần đầu đọc bảng từ cache trên đĩa.
+    """
+    distances = _by_layout.get(layout.key, _MISSING)
+    if distances is not _MISSING:
+        return distances
+
+    distances = None
+    if int((~layout.walls).sum()) <= MAX_DISTANCE_CELLS:
+        key = walls_key(layout.walls)
+        # khóa theo tường: dựng bảng một map không chặn tra cứu / dựng bảng map khác
+        with _build_lock(key):
+            distances = _memory_cache.get(key)
+            if distances is None:
+                dist, next_hop = _load_or_build(layout, key, cache_dir)
+                distances = _memory_cache[key] = MazeDistances(layout, dist, next_hop)
+    _by_layout[layout.key] = distances
+    return distances
@@ -1,19 +1,20 @@
-import numpy as np
 from envs.game_state import GameState
 from envs import layouts
-from envs.directions import Actions, Directions
+from envs.directions import Directions
+from envs.topology import DIRECTION_INDEX
+import numpy as np
 from config import point
 
+SCARED_TIME = 40
+
 class GameEngine:
     @staticmethod
     def get_ghost_id(ghost_idx: int) -> int:
-        ghost_ids = [layouts.GHOST1, layouts.GHOST2, layouts.GHOST3, layouts.GHOST4]
-        return ghost_ids[ghost_idx]
+        return layouts.ghost_id(ghost_idx)
 
     @staticmethod
-    def get_ghost_spawn(ghost_idx: int) -> tuple[int, int]:
-        ghost_spawns = [(1, 1), (3, 1), (1, 3), (3, 3)]
-        return ghost_spawns[ghost_idx] if ghost_idx < len(ghost_spawns) else (1, 1)
+    def get_ghost_spawn(state: GameState, ghost_idx: int) -> tuple[int, int]:
+        return state.layout.get_ghost_spawn(ghost_idx)
 
     @staticmethod
     def apply_action(state: GameState, agent_idx: int, action: str):
@@ -26,62 +27,105 @@ class GameEngine:
             GameEngine.move_ghost(state, agent_idx - 1, action)
 
     @staticmethod
-    def move_pacman(state: GameState, action: str):
+    def apply_joint_action(state: GameState, actions):
+        """Áp dụng action của mọi agent trong một tick.
+
+        actions: dict {agent_idx: action} hoặc list theo agent_idx; None / action
+        không hợp lệ = agent đó đứng yên. Thứ tự: Pacman di chuyển trước (ăn food,
+        va chạm với ghost tại ô mới), sau đó mọi ghost di chuyển đồng thời và va
+        chạm với Pacman được xử lý theo thứ tự index ghost. Ghost đi xuyên qua
+        Pacman (đổi chỗ) luôn bị bắt ở bước Pacman nên không cần luật riêng.
+        """
+        if state.win or state.lose:
+            return
+
+        if isinstance(actions, dict):
+            get = actions.get
+        else:
+            get = lambda i: actions[i] if i < len(actions) else None
+
+        pacman_action = get(0)
+        if pacman_action in Directions.ALL:
+            GameEngine.move_pacman(state, pacman_action)
+        if not (state.win or state.lose):
+            GameEngine.move_ghosts(state, [get(i + 1) for i in range(state.num_ghosts())])
+
+    @staticmethod
+    def move_ghosts(state: GameState, ghost_actions):
+        acting = np.array([a in Directions.ALL for a in ghost_actions], dtype=bool)
+        if not acting.any():
+            return
+
+        topology = state.layout.topology
+        W = topology.width
+        xy = state.ghost_xy
+        cells = xy[:, 1] * W + xy[:, 0]
+        dir_idx = np.array([DIRECTION_INDEX.get(a, 0) for a in ghost_actions], dtype=np.int64)
+        target = topology.neighbors[cells, dir_idx]
+        moved = acting & (target >= 0)
+        new_cells = np.where(moved, target, cells)
+        state.set_ghost_positions(
+            np.stack([new_cells % W, new_cells // W], axis=1),
+            [a if m else None for a, m in zip(ghost_actions, moved.tolist())]
+        )
+
+        timers = state.scared
+        state.set_scared_timers(np.where(acting & (timers > 0), timers - 1, timers))
+
         pac = state.pacman
-        dx, dy = Actions.directionToVector(action)
-        nx, ny = int(pac.x + dx), int(pac.y + dy)
-        H, W = state.object_matrix.shape
+        hits = acting & (new_cells == int(pac.y) * W + int(pac.x))
+        for i in np.flatnonzero(hits).tolist():
+            GameEngine._resolve_collision(state, i)
+            if state.lose:
+                return
 
-        if not (0 <= nx < W and 0 <= ny < H) or state.is_wall(nx, ny):
+    @staticmethod
+    def move_pacman(state: GameState, action: str):
+        pac = state.pacman
+        target = state.layout.topology.next_position(int(pac.x), int(pac.y), action)
+        if target is None:
             return
+        nx, ny = target
 
-        target = state.object_matrix[ny, nx]
-        if target == layouts.FOOD:
+        if state.is_food(nx, ny):
             state.score += point.FOOD_REWARD
-            state.object_matrix[ny, nx] = layouts.EMPTY
-        elif target == layouts.CAPSULE:
+            state.remove_food(nx, ny)
+        elif state.is_capsule(nx, ny):
             state.score += point.CAPSULE_REWARD
-            state.object_matrix[ny, nx] = layouts.EMPTY
-            for g in state.ghosts:
-                g.scared_timer = 40
+            state.remove_capsule(nx, ny)
+            state.set_all_scared_timers(SCARED_TIME)
 
-        pac.x, pac.y = nx, ny
-        pac.dir = action
+        state.move_pacman_to(nx, ny, action)
 
-        for i, g in enumerate(state.ghosts):
-            if int(g.x) == pac.x and int(g.y) == pac.y:
-                GameEngine._resolve_collision(state, i)
-                if state.lose: return
+        for i in state.ghosts_at(nx, ny).tolist():
+            GameEngine._resolve_collision(state, i)
+            if state.lose: return
 
-        if not np.any(np.isin(state.object_matrix, [layouts.FOOD, layouts.CAPSULE])):
-            state.win = True
+        state.update_win()
 
     @staticmethod
     def move_ghost(state: GameState, ghost_idx: int, action: str):
-        ghost = state.ghosts[ghost_idx]
-        dx, dy = Actions.directionToVector(action)
-        nx, ny = int(ghost.x + dx), int(ghost.y + dy)
-        H, W = state.object_matrix.shape
-
-        if 0 <= nx < W and 0 <= ny < H and not state.is_wall(nx, ny):
-            ghost.x, ghost.y = nx, ny
-            ghost.dir = action
+        gx, gy = state.getGhostPosition(ghost_idx)
+        target = state.layout.topology.next_position(gx, gy, action)
+        if target is not None:
+            state.move_ghost_to(ghost_idx, target[0], target[1], action)
+            gx, gy = target
 
-        if ghost.scared_timer > 0:
-            ghost.scared_timer -= 1
+        timer = int(state.scared[ghost_idx])
+        if timer > 0:
+            state.set_scared_timer(ghost_idx, timer - 1)
 
         pac = state.pacman
-        if int(ghost.x) == int(pac.x) and int(ghost.y) == int(pac.y):
+        if gx == int(pac.x) and gy == int(pac.y):
             GameEngine._resolve_collision(state, ghost_idx)
 
     @staticmethod
     def _resolve_collision(state: GameState, ghost_idx: int):
-        ghost = state.ghosts[ghost_idx]
-        spawn_x, spawn_y = GameEngine.get_ghost_spawn(ghost_idx)
+        spawn_x, spawn_y = GameEngine.get_ghost_spawn(state, ghost_idx)
 
-        if ghost.scared_timer > 0:
+        if state.scared[ghost_idx] > 0:
             state.score += point.GHOST_EAT_REWARD
-            ghost.x, ghost.y = spawn_x, spawn_y
-            ghost.scared_timer = 0
+            state.move_ghost_to(ghost_idx, spawn_x, spawn_y)
+            state.set_scared_timer(ghost_idx, 0)
         else:
             state.lose = True
\ No newline at end of file
@@ -1,9 +1,11 @@
 from dataclasses import dataclass, field
 import numpy as np
-from typing import List
+from typing import List, Set, Tuple
 
-from envs.directions import Actions
 from envs import layouts
+from envs import bitplane
+from envs.static_layout import StaticLayout
+from envs import zobrist
 
 @dataclass
 class AgentInfo:
@@ -17,28 +19,157 @@ class GhostInfo(AgentInfo):
 
 @dataclass
 class GameState:
-    object_matrix: np.ndarray
+    # tường + spawn dùng chung theo layout; food / capsule là mặt phẳng bit nén
+    layout: StaticLayout
+    food: np.ndarray
+    capsules: np.ndarray
     pacman: AgentInfo
-    ghosts: List[GhostInfo] = field(default_factory=list)
+    # ghost lưu dạng struct-of-arrays: vị trí (G, 2), hướng, scared timer (G,)
+    ghost_xy: np.ndarray = None
+    ghost_dirs: List[str] = None
+    scared: np.ndarray = None
     score: float = 0.0
     win: bool = False
     lose: bool = False
+    # bộ đếm và chỉ mục food được cập nhật dần, tránh quét cả lưới
+    num_food: int = None
+    num_capsules: int = None
+    food_positions: Set[Tuple[int, int]] = None
+    # hash Zobrist 64-bit: vị trí agent, scared timer, tập food / capsule
+    zobrist: int = None
+    # True khi food / capsules / food_positions đang dùng chung với state khác (copy-on-write)
+    shared_planes: bool = field(default=False, repr=False, compare=False)
+    # tăng ở mọi mutator công khai; các view dẫn xuất được cache theo version
+    version: int = 0
+    _views: dict = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.ghost_xy is None:
+            self.ghost_xy = np.zeros((0, 2), dtype=np.int32)
+        self.ghost_xy = np.asarray(self.ghost_xy, dtype=np.int32).reshape(-1, 2)
+        G = len(self.ghost_xy)
+        if self.ghost_dirs is None:
+            self.ghost_dirs = ["East"] * G
+        if self.scared is None:
+            self.scared = np.zeros(G, dtype=np.int32)
+        self.scared = np.asarray(self.scared, dtype=np.int32)
+        if self.num_food is None:
+            self.num_food = bitplane.popcount(self.food)
+        if self.num_capsules is None:
+            self.num_capsules = bitplane.popcount(self.capsules)
+        if self.food_positions is None:
+            W = self.layout.width
+            self.food_positions = {
+                (int(i % W), int(i // W)) for i in bitplane.indices(self.food, self.layout.size)
+            }
+        if self.zobrist is None:
+            self.zobrist = self.compute_zobrist()
+
+    def compute_zobrist(self) -> int:
+        W, size = self.layout.width, self.layout.size
+        h = 0
+        if self.pacman is not None:
+            h ^= zobrist.key(zobrist.PACMAN, int(self.pacman.y) * W + int(self.pacman.x))
+        ghost_ids = np.arange(len(self.ghost_xy))
+        h ^= zobrist.xor_keys(zobrist.GHOST, self.ghost_xy[:, 1] * W + self.ghost_xy[:, 0], ghost_ids)
+        h ^= zobrist.xor_keys(zobrist.SCARED, self.scared, ghost_ids)
+        h ^= zobrist.xor_keys(zobrist.FOOD, bitplane.indices(self.food, size))
+        h ^= zobrist.xor_keys(zobrist.CAPSULE, bitplane.indices(self.capsules, size))
+        return h
+
+    @classmethod
+    def from_matrix(cls, object_matrix: np.ndarray, pacman: AgentInfo,
+                    ghosts: List[GhostInfo] = None, score: float = 0.0,
+                    win: bool = False, lose: bool = False) -> "GameState":
+        object_matrix = np.asarray(object_matrix)
+        return cls(
+            layout=StaticLayout.from_object_matrix(object_matrix),
+            food=bitplane.pack(object_matrix == layouts.FOOD),
+            capsules=bitplane.pack(object_matrix == layouts.CAPSULE),
+            pacman=pacman,
+            **ghost_fields(ghosts),
+            score=score,
+            win=win,
+            lose=lose
+        )
 
     def copy(self) -> "GameState":
+        # phần tĩnh và mặt phẳng food dùng chung, chỉ sao chép khi bị ghi
+        self.shared_planes = True
         return GameState(
-            object_matrix=self.object_matrix.copy(),
+            layout=self.layout,
+            food=self.food,
+            capsules=self.capsules,
             pacman=AgentInfo(self.pacman.x, self.pacman.y, self.pacman.dir),
-            ghosts=[GhostInfo(g.x, g.y, g.dir, g.scared_timer) for g in self.ghosts],
+            ghost_xy=self.ghost_xy.copy(),
+            ghost_dirs=list(self.ghost_dirs),
+            scared=self.scared.copy(),
             score=self.score,
             win=self.win,
-            lose=self.lose
+            lose=self.lose,
+            num_food=self.num_food,
+            num_capsules=self.num_capsules,
+            food_positions=self.food_positions,
+            zobrist=self.zobrist,
+            shared_planes=True,
+            version=self.version,
+            _views=dict(self._views)
         )
 
+    def generateSuccessor(self, agent_index: int, action: str) -> "GameState":
+        from envs.game_engine import GameEngine
+        successor = self.copy()
+        GameEngine.apply_action(successor, agent_index, action)
+        return successor
+
+    def _own_planes(self):
+        if self.shared_planes:
+            self.food = self.food.copy()
+            self.capsules = self.capsules.copy()
+            self.food_positions = set(self.food_positions)
+            self.shared_planes = False
+
+    def bump_version(self):
+        self.version += 1
+
+    def _cached_view(self, name, compute):
+        entry = self._views.get(name)
+        if entry is not None and entry[0] == self.version:
+            return entry[1]
+        value = compute()
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+        self._views[name] = (self.version, value)
+        return value
+
+    def _build_object_matrix(self) -> np.ndarray:
+        matrix = self.layout.static_matrix.copy()
+        matrix[self.getFood()] = layouts.FOOD
+        matrix[self.getCapsules()] = layouts.CAPSULE
+        return matrix
+
+    @property
+    def object_matrix(self) -> np.ndarray:
+        return self._cached_view("object_matrix", self._build_object_matrix)
+
+    @property
+    def shape(self):
+        return self.layout.shape
+
+    @property
+    def ghosts(self) -> List[GhostInfo]:
+        # ảnh chụp chỉ đọc; thay đổi ghost phải đi qua move_ghost_to / set_scared_timer
+        return [
+            GhostInfo(x, y, d, t)
+            for (x, y), d, t in zip(self.ghost_xy.tolist(), self.ghost_dirs, self.scared.tolist())
+        ]
+
     def getPacmanPosition(self):
         return self.pacman.x, self.pacman.y
 
     def getGhostPosition(self, i: int):
-        return self.ghosts[i].x, self.ghosts[i].y
+        x, y = self.ghost_xy[i].tolist()
+        return x, y
 
     def getAgentPosition(self, agent_index: int):
         if agent_index == 0:
@@ -47,38 +178,138 @@ class GameState:
 
     def getLegalActions(self, agent_index: int):
         if agent_index == 0:
-            pos = self.getPacmanPosition()
+            x, y = self.pacman.x, self.pacman.y
         else:
-            pos = self.getGhostPosition(agent_index - 1)
-        walls = self.object_matrix == layouts.WALL
-        return Actions.getLegalActions(pos, walls)
+            x, y = self.ghost_xy[agent_index - 1].tolist()
+        return self.layout.topology.getLegalActions(int(x), int(y))
 
     def ghost_scared_timer(self, i: int):
-        return self.ghosts[i].scared_timer
+        return int(self.scared[i])
 
     def is_ghost_scared(self, i: int):
-        return self.ghosts[i].scared_timer > 0
+        return bool(self.scared[i] > 0)
 
     def num_ghosts(self):
-        return len(self.ghosts)
+        return len(self.ghost_xy)
 
     def is_wall(self, x, y):
-        return self.object_matrix[y, x] == layouts.WALL
+        return bool(self.layout.walls[y, x])
 
     def is_food(self, x, y):
-        return self.object_matrix[y, x] == layouts.FOOD
+        return bitplane.test(self.food, self.layout.cell_index(x, y))
 
     def is_capsule(self, x, y):
-        return self.object_matrix[y, x] == layouts.CAPSULE
+        return bitplane.test(self.capsules, self.layout.cell_index(x, y))
+
+    def ghosts_at(self, x, y) -> np.ndarray:
+        return np.flatnonzero((self.ghost_xy[:, 0] == x) & (self.ghost_xy[:, 1] == y))
 
     def is_ghost(self, x, y):
-        return any(g.x == x and g.y == y for g in self.ghosts)
+        return bool(((self.ghost_xy[:, 0] == x) & (self.ghost_xy[:, 1] == y)).any())
+
+    def remove_food(self, x, y):
+        self._own_planes()
+        cell = self.layout.cell_index(x, y)
+        bitplane.clear(self.food, cell)
+        self.food_positions.discard((x, y))
+        self.num_food -= 1
+        self.zobrist ^= zobrist.key(zobrist.FOOD, cell)
+        self.bump_version()
+
+    def remove_capsule(self, x, y):
+        self._own_planes()
+        cell = self.layout.cell_index(x, y)
+        bitplane.clear(self.capsules, cell)
+        self.num_capsules -= 1
+        self.zobrist ^= zobrist.key(zobrist.CAPSULE, cell)
+        self.bump_version()
+
+    def add_food(self, x, y):
+        self._own_planes()
+        cell = self.layout.cell_index(x, y)
+        bitplane.set_bit(self.food, cell)
+        self.food_positions.add((x, y))
+        self.num_food += 1
+        self.zobrist ^= zobrist.key(zobrist.FOOD, cell)
+        self.bump_version()
+
+    def add_capsule(self, x, y):
+        self._own_planes()
+        cell = self.layout.cell_index(x, y)
+        bitplane.set_bit(self.capsules, cell)
+        self.num_capsules += 1
+        self.zobrist ^= zobrist.key(zobrist.CAPSULE, cell)
+        self.bump_version()
+
+    def move_pacman_to(self, x, y, direction=None):
+        W = self.layout.width
+        pac = self.pacman
+        self.zobrist ^= zobrist.key(zobrist.PACMAN, int(pac.y) * W + int(pac.x)) \
+            ^ zobrist.key(zobrist.PACMAN, y * W + x)
+        pac.x, pac.y = x, y
+        if direction is not None:
+            pac.dir = direction
+        self.bump_version()
+
+    def move_ghost_to(self, i, x, y, direction=None):
+        W = self.layout.width
+        gx, gy = self.ghost_xy[i].tolist()
+        self.zobrist ^= zobrist.key(zobrist.GHOST, gy * W + gx, i) \
+            ^ zobrist.key(zobrist.GHOST, y * W + x, i)
+        self.ghost_xy[i] = (x, y)
+        if direction is not None:
+            self.ghost_dirs[i] = direction
+        self.bump_version()
+
+    def set_scared_timer(self, i, value):
+        old = int(self.scared[i])
+        if old == value:
+            return
+        self.zobrist ^= zobrist.key(zobrist.SCARED, old, i) ^ zobrist.key(zobrist.SCARED, int(value), i)
+        self.scared[i] = value
+        self.bump_version()
+
+    def set_scared_timers(self, timers):
+        new = np.asarray(timers, dtype=np.int32)
+        changed = np.flatnonzero(new != self.scared)
+        if changed.size:
+            self.zobrist ^= zobrist.xor_keys(zobrist.SCARED, self.scared[changed], changed) \
+                ^ zobrist.xor_keys(zobrist.SCARED, new[changed], changed)
+        self.scared = new.copy()
+        self.bump_version()
+
+    def set_all_scared_timers(self, value):
+        self.set_scared_timers(np.full(len(self.scared), value, dtype=np.int32))
+
+    def set_ghost_positions(self, ghost_xy, directions=None):
+        # directions: list hướng theo ghost, None = giữ nguyên hướng cũ
+        W = self.layout.width
+        new = np.asarray(ghost_xy, dtype=np.int32).reshape(-1, 2)
+        changed = np.flatnonzero((new != self.ghost_xy).any(axis=1))
+        if changed.size:
+            old_cells = self.ghost_xy[changed, 1] * W + self.ghost_xy[changed, 0]
+            new_cells = new[changed, 1] * W + new[changed, 0]
+            self.zobrist ^= zobrist.xor_keys(zobrist.GHOST, old_cells, changed) \
+                ^ zobrist.xor_keys(zobrist.GHOST, new_cells, changed)
+        self.ghost_xy = new.copy()
+        if directions is not None:
+            self.ghost_dirs = [d if d is not None else old for d, old in zip(directions, self.ghost_dirs)]
+        self.bump_version()
+
+    def zobrist_hash(self) -> int:
+        return self.zobrist
+
+    def getNumFood(self) -> int:
+        return self.num_food
+
+    def getNumCapsules(self) -> int:
+        return self.num_capsules
+
+    def getFoodPositions(self) -> Set[Tuple[int, int]]:
+        return self.food_positions
 
     def has_food_or_capsule(self):
-        return np.any(
-            (self.object_matrix == layouts.FOOD) |
-            (self.object_matrix == layouts.CAPSULE)
-        )
+        return self.num_food + self.num_capsules > 0
 
     def update_win(self):
         if not self.has_food_or_capsule():
@@ -97,15 +328,35 @@ class GameState:
         return self.win or self.lose
 
     def getFood(self):
-        return self.object_matrix == layouts.FOOD
+        return self._cached_view("food", lambda: bitplane.unpack(self.food, self.layout.shape))
+
+    def getCapsules(self):
+        return self._cached_view("capsules", lambda: bitplane.unpack(self.capsules, self.layout.shape))
+
+    def getGhostPositions(self):
+        # tuple: view cache dùng chung giữa các bản copy nên không được sửa tại chỗ
+        return self._cached_view("ghost_positions", lambda: tuple(tuple(p) for p in self.ghost_xy.tolist()))
 
     def getWalls(self):
-        return self.object_matrix == layouts.WALL
+        return self.layout.walls
+
+
+def ghost_fields(ghosts: List[GhostInfo] = None) -> dict:
+    ghosts = list(ghosts or [])
+    return {
+        "ghost_xy": np.array([[g.x, g.y] for g in ghosts], dtype=np.int32).reshape(-1, 2),
+        "ghost_dirs": [g.dir for g in ghosts],
+        "scared": np.array([g.scared_timer for g in ghosts], dtype=np.int32),
+    }
 
 
 def serialize_state(state: GameState) -> dict:
+    return {"object_matrix": state.object_matrix.tolist(), **serialize_agents(state)}
+
+
+def serialize_agents(state: GameState) -> dict:
+    # phần thay đổi mỗi tick: agent, điểm, cờ kết thúc
     return {
-        "object_matrix": state.object_matrix.tolist(),
         "pacman": {
             "x": state.pacman.x,
             "y": state.pacman.y,
@@ -113,11 +364,11 @@ def serialize_state(state: GameState) -> dict:
         },
         "ghosts": [
             {
-                "x": g.x,
-                "y": g.y,
-                "dir": g.dir,
-                "scared_timer": g.scared_timer
-            } for g in state.ghosts
+                "x": x,
+                "y": y,
+                "dir": d,
+                "scared_timer": t
+            } for (x, y), d, t in zip(state.ghost_xy.tolist(), state.ghost_dirs, state.scared.tolist())
         ],
         "score": state.score,
         "win": state.win,
@@ -126,8 +377,8 @@ def serialize_state(state: GameState) -> dict:
 
 
 def deserialize_state(d: dict) -> GameState:
-    return GameState(
-        object_matrix=np.array(d["object_matrix"]),
+    return GameState.from_matrix(
+        object_matrix=np.array(d["object_matrix"], dtype=np.uint8),
         pacman=AgentInfo(**d["pacman"]),
         ghosts=[GhostInfo(**g) for g in d["ghosts"]],
         score=d["score"],
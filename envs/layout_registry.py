@@ -0,0 +1,141 @@
+import glob
+import hashlib
+import os
+import threading
+import numpy as np
+
+from envs.distances import get_maze_distances
+from envs.game_state import GameState, AgentInfo
+from envs.map_loader import parse_map
+from envs.static_layout import StaticLayout
+from config.cache_config import PROJECT_ROOT, CACHE_DIR
+
+MAPS_DIR = os.path.join(PROJECT_ROOT, "maps")
+LAYOUT_CACHE_DIR = os.path.join(CACHE_DIR, "layouts")
+MAP_EXT = ".map"
+
+
+class LayoutRegistry:
+    """Danh mục các map trong maps/, mỗi map được biên dịch một lần sang dạng nhị phân.
+
+    Map được tham chiếu theo tên (tên file không có .map) hoặc theo đường dẫn.
+    Bản biên dịch (.npz) được lưu trong cache/layouts/ theo hash nội dung file,
+    nên lần chạy sau không phải parse lại; new_state() trả về bản sao rẻ
+    của trạng thái ban đầu. Bảng khoảng cách mê cung cũng được chuẩn bị khi nạp map.
+    """
+
+    def __init__(self, maps_dir: str = MAPS_DIR, cache_dir: str = LAYOUT_CACHE_DIR):
+        self.maps_dir = maps_dir
+        self.cache_dir = cache_dir
+        self._paths = {}
+        self._states = {}
+        self._lock = threading.Lock()
+        self.discover()
+
+    def discover(self):
+        with self._lock:
+            for path in sorted(glob.glob(os.path.join(self.maps_dir, "*" + MAP_EXT))):
+                self._paths[os.path.basename(path)[:-len(MAP_EXT)]] = os.path.abspath(path)
+        return self.names()
+
+    def names(self):
+        return sorted(self._paths)
+
+    def register(self, path: str) -> str:
+        path = os.path.abspath(path)
+        name = os.path.basename(path)
+        if name.endswith(MAP_EXT):
+            name = name[:-len(MAP_EXT)]
+        with self._lock:
+            if self._paths.get(name, path) != path:
+                name = path
+            self._paths[name] = path
+        return name
+
+    def resolve(self, name_or_path: str) -> str:
+        if name_or_path in self._paths:
+            return name_or_path
+        if os.path.isfile(name_or_path):
+            return self.register(name_or_path)
+        raise KeyError(f"Unknown layout '{name_or_path}' (available: {', '.join(self.names())})")
+
+    def path(self, name_or_path: str) -> str:
+        return self._paths[self.resolve(name_or_path)]
+
+    def get_initial_state(self, name_or_path: str) -> GameState:
+        name = self.resolve(name_or_path)
+        state = self._states.get(name)
+        if state is None:
+            state = self._load(self._paths[name])
+            # bảng khoảng cách dựng (hoặc đọc từ cache) lúc nạp map, không phải giữa ván
+            get_maze_distances(state.layout)
+            with self._lock:
+                state = self._states.setdefault(name, state)
+        return state
+
+    def new_state(self, name_or_path: str) -> GameState:
+        return self.get_initial_state(name_or_path).copy()
+
+    def cycle(self, names=None):
+        names = list(names) if names else self.names()
+        while True:
+            for name in names:
+                yield name
+
+    def _load(self, path: str) -> GameState:
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        stem = os.path.basename(path)[:-len(MAP_EXT)] if path.endswith(MAP_EXT) else os.path.basename(path)
+        compiled = os.path.join(self.cache_dir, f"{stem}-{digest}.npz")
+
+        if os.path.isfile(compiled):
+            try:
+                return self._read_compiled(compiled)
+            except (OSError, KeyError, ValueError):
+                pass
+
+        state = parse_map(raw.decode("utf-8").splitlines())
+        self._write_compiled(compiled, state)
+        return state
+
+    def _write_compiled(self, compiled: str, state: GameState):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{compiled[:-4]}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp,
+            static_matrix=state.layout.static_matrix,
+            neighbors=state.layout.topology.neighbors,
+            food=state.food,
+            capsules=state.capsules,
+            pacman=np.array([state.pacman.x, state.pacman.y], dtype=np.int32),
+            ghosts=state.ghost_xy,
+        )
+        os.replace(tmp, compiled)
+
+    def _read_compiled(self, compiled: str) -> GameState:
+        with np.load(compiled) as data:
+            layout = StaticLayout.intern(data["static_matrix"], data["neighbors"])
+            px, py = data["pacman"].tolist()
+            return GameState(
+                layout=layout,
+                food=data["food"].copy(),
+                capsules=data["capsules"].copy(),
+                pacman=AgentInfo(x=px, y=py, dir="East"),
+                ghost_xy=data["ghosts"].astype(np.int32),
+                score=0.0,
+                win=False,
+                lose=False
+            )
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_registry() -> LayoutRegistry:
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = LayoutRegistry()
+        return _default_registry
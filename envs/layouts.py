@@ -12,6 +12,12 @@ GHOST1 = 5      # ghost loại 1
 GHOST2 = 6      # ghost loại 2
 GHOST3 = 7      # ghost loại 3
 GHOST4 = 8      # ghost loại 4
+MAX_OBJECT_ID = 255
+
+
+def ghost_id(ghost_idx: int) -> int:
+    # ghost thứ i (đếm từ 0) dùng id GHOST1 + i, giới hạn trong uint8
+    return min(GHOST1 + ghost_idx, MAX_OBJECT_ID)
 
 # -------------------------
 GRID_SIZE = 20
@@ -0,0 +1,49 @@
+import numpy as np
+
+from envs.game_state import GameState, AgentInfo, GhostInfo, ghost_fields
+from envs import layouts
+from envs import bitplane
+from envs.static_layout import StaticLayout
+
+
+def parse_map(lines) -> GameState:
+    lines = [line.rstrip("\n") for line in lines if line.strip()]
+
+    H, W = len(lines), len(lines[0])
+    static_matrix = np.zeros((H, W), dtype=np.uint8)
+    food = np.zeros((H, W), dtype=bool)
+    capsules = np.zeros((H, W), dtype=bool)
+    pacman = None
+    ghosts = []
+
+    for y, line in enumerate(lines):
+        for x, ch in enumerate(line):
+            if ch == '%':
+                static_matrix[y, x] = layouts.WALL
+            elif ch == '.':
+                food[y, x] = True
+            elif ch == 'o':
+                capsules[y, x] = True
+            elif ch == 'P':
+                static_matrix[y, x] = layouts.PACMAN
+                pacman = AgentInfo(x=x, y=y, dir="East")
+            elif ch == 'G':
+                ghost_id = len(ghosts)
+                static_matrix[y, x] = layouts.ghost_id(ghost_id)
+                ghosts.append(GhostInfo(x=x, y=y, dir="East", scared_timer=0))
+
+    return GameState(
+        layout=StaticLayout.intern(static_matrix),
+        food=bitplane.pack(food),
+        capsules=bitplane.pack(capsules),
+        pacman=pacman,
+        **ghost_fields(ghosts),
+        score=0.0,
+        win=False,
+        lose=False
+    )
+
+
+def load_map(file_path: str) -> GameState:
+    with open(file_path, "r") as f:
+        return parse_map(f.readlines())
@@ -0,0 +1,129 @@
+# maze_generator.py
+# -------------------------
+# Sinh map ngẫu nhiên có seed theo định dạng .map (%, ., o, P, G)
+# Ví dụ: python -m envs.maze_generator --width 101 --height 101 --ghosts 16 --seed 1 -o maps/big101.map
+# -------------------------
+import argparse
+import os
+import random
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+WALL_CH = "%"
+EMPTY_CH = " "
+FOOD_CH = "."
+CAPSULE_CH = "o"
+PACMAN_CH = "P"
+GHOST_CH = "G"
+
+
+def generate_maze(width: int, height: int, corridor_density: float = 0.3, food_density: float = 0.8,
+                  num_capsules: int = 4, num_ghosts: int = 2, seed: int = None):
+    """Trả về danh sách dòng của map.
+
+    Mê cung được đào bằng DFS trên các ô tọa độ lẻ (luôn liên thông), sau đó
+    corridor_density là tỉ lệ tường ngăn còn lại bị đục thêm để tạo vòng lặp.
+    """
+    if width < 5 or height < 5:
+        raise ValueError("width and height must be at least 5")
+    needed = 1 + num_ghosts + num_capsules
+    rng = random.Random(seed)
+
+    # kích thước lẻ để mỗi ô mê cung có tường bao quanh
+    W = width if width % 2 else width - 1
+    H = height if height % 2 else height - 1
+    cw, ch = (W - 1) // 2, (H - 1) // 2
+    if cw * ch < needed:
+        raise ValueError("map too small for the requested agents and capsules")
+
+    grid = np.full((height, width), WALL_CH, dtype="<U1")
+    visited = np.zeros((ch, cw), dtype=bool)
+    steps = [(0, -1), (0, 1), (1, 0), (-1, 0)]
+
+    start = (rng.randrange(cw), rng.randrange(ch))
+    visited[start[1], start[0]] = True
+    grid[2 * start[1] + 1, 2 * start[0] + 1] = EMPTY_CH
+    stack = [start]
+    while stack:
+        cx, cy = stack[-1]
+        options = [
+            (cx + dx, cy + dy) for dx, dy in steps
+            if 0 <= cx + dx < cw and 0 <= cy + dy < ch and not visited[cy + dy, cx + dx]
+        ]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        visited[ny, nx] = True
+        grid[2 * ny + 1, 2 * nx + 1] = EMPTY_CH
+        grid[cy + ny + 1, cx + nx + 1] = EMPTY_CH
+        stack.append((nx, ny))
+
+    # đục thêm tường ngăn giữa hai ô kề nhau để tạo hành lang vòng
+    if corridor_density > 0:
+        inner = grid[1:H - 1, 1:W - 1]
+        ys, xs = np.nonzero(inner == WALL_CH)
+        ys, xs = ys + 1, xs + 1
+        between = ((ys % 2 == 1) & (xs % 2 == 0)) | ((ys % 2 == 0) & (xs % 2 == 1))
+        ys, xs = ys[between], xs[between]
+        np_rng = np.random.default_rng(rng.getrandbits(32))
+        knock = np_rng.random(len(ys)) < corridor_density
+        grid[ys[knock], xs[knock]] = EMPTY_CH
+
+    open_cells = list(zip(*np.nonzero(grid == EMPTY_CH)))
+    rng.shuffle(open_cells)
+    (py, px), rest = open_cells[0], open_cells[1:]
+    grid[py, px] = PACMAN_CH
+    for y, x in rest[:num_ghosts]:
+        grid[y, x] = GHOST_CH
+    rest = rest[num_ghosts:]
+    for y, x in rest[:num_capsules]:
+        grid[y, x] = CAPSULE_CH
+    rest = rest[num_capsules:]
+    for y, x in rest[:int(round(len(rest) * food_density))]:
+        grid[y, x] = FOOD_CH
+
+    return ["".join(row) for row in grid]
+
+
+def write_map(path: str, lines) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a procedural Pacman layout (.map)")
+    parser.add_argument("--width", type=int, default=41)
+    parser.add_argument("--height", type=int, default=21)
+    parser.add_argument("--corridor-density", type=float, default=0.3)
+    parser.add_argument("--food-density", type=float, default=0.8)
+    parser.add_argument("--capsules", type=int, default=4)
+    parser.add_argument("--ghosts", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None,
+                        help="output path (default: maps/gen_<w>x<h>_s<seed>.map)")
+    args = parser.parse_args(argv)
+
+    lines = generate_maze(
+        args.width, args.height,
+        corridor_density=args.corridor_density,
+        food_density=args.food_density,
+        num_capsules=args.capsules,
+        num_ghosts=args.ghosts,
+        seed=args.seed,
+    )
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "maps",
+        f"gen_{args.width}x{args.height}_s{args.seed}.map"
+    )
+    write_map(output, lines)
+    print(f"[MazeGen] Wrote {output} ({len(lines[0])}x{len(lines)})")
+
+
+if __name__ == "__main__":
+    main()
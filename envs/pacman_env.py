@@ -0,0 +1,100 @@
+import random
+
+from envs.game_state import GameState
+from envs.game_engine import GameEngine
+from envs.layout_registry import get_registry
+from config import point
+
+# reward của step():
+#   REWARD_DELTA: điểm thay đổi trong step (sau cả lượt ghost) + thưởng thắng / phạt chết
+#   REWARD_SCORE: như vòng train_ui cũ: tổng điểm hiện tại ngay sau nước đi của Pacman
+#                 (trước khi ghost đi) + thưởng thắng / phạt chết
+REWARD_DELTA = "delta"
+REWARD_SCORE = "score"
+
+
+class PacmanEnv:
+    """Môi trường headless kiểu gym: reset(seed) / step(action) cho Pacman.
+
+    Map lấy từ LayoutRegistry (tên hoặc đường dẫn) nên chỉ được biên dịch một lần;
+    mỗi reset() sao chép trạng thái ban đầu và có thể đổi sang layout khác.
+    Các ghost agent chạy bên trong env và được seed từ seed của reset().
+    Mỗi step trả về một GameState mới, observation cũ không bị thay đổi.
+    reward_mode chọn cách tính reward (REWARD_DELTA hoặc REWARD_SCORE, xem ở trên).
+    """
+
+    def __init__(self, map_file: str, ghost_agents=None, ghost_algos=("random_ghost", "random_ghost"),
+                 max_steps: int = None, reward_mode: str = REWARD_DELTA):
+        if reward_mode not in (REWARD_DELTA, REWARD_SCORE):
+            raise ValueError(f"Unknown reward_mode '{reward_mode}'")
+        self.registry = get_registry()
+        self.map_file = map_file
+        self.initial_state = self.registry.get_initial_state(map_file)
+        if ghost_agents is None:
+            from agents.factory import make_agent
+            ghost_agents = [make_agent(algo, i + 1) for i, algo in enumerate(ghost_algos)]
+        self.ghost_agents = list(ghost_agents)
+        self.max_steps = max_steps
+        self.reward_mode = reward_mode
+        self.rng = random.Random()
+        self.state = None
+        self.steps = 0
+
+    @property
+    def num_agents(self) -> int:
+        return 1 + len(self.ghost_agents)
+
+    def seed(self, seed=None) -> None:
+        self.rng.seed(seed)
+        for agent in self.ghost_agents:
+            if hasattr(agent, "seed"):
+                agent.seed(self.rng.getrandbits(32))
+
+    def reset(self, seed=None, layout: str = None) -> GameState:
+        if seed is not None:
+            self.seed(seed)
+        if layout is not None:
+            self.map_file = layout
+            self.initial_state = self.registry.get_initial_state(layout)
+        self.state = self.initial_state.copy()
+        self.steps = 0
+        for agent in self.ghost_agents:
+            agent.registerInitialState(self.state)
+        return self.state
+
+    def getLegalActions(self):
+        return self.state.getLegalActions(0)
+
+    def step(self, action: str):
+        if self.state is None:
+            raise RuntimeError("PacmanEnv.step() called before reset()")
+        if self.state.isGameOver():
+            return self.state, 0.0, True, self._info()
+
+        state = self.state.copy()
+        self.state = state
+        prev_score = state.score
+        GameEngine.apply_action(state, 0, action)
+        pacman_score = state.score
+        for agent in self.ghost_agents:
+            if state.isGameOver():
+                break
+            GameEngine.apply_action(state, agent.index, agent.getAction(state))
+        self.steps += 1
+
+        reward = pacman_score if self.reward_mode == REWARD_SCORE else state.score - prev_score
+        if state.isWin():
+            reward += point.WIN_REWARD
+        elif state.isLose():
+            reward += point.PACMAN_DEATH_PENALTY
+
+        done = state.isGameOver() or (self.max_steps is not None and self.steps >= self.max_steps)
+        return state, float(reward), done, self._info()
+
+    def _info(self) -> dict:
+        return {
+            "score": self.state.score,
+            "win": self.state.win,
+            "lose": self.state.lose,
+            "steps": self.steps,
+        }
@@ -0,0 +1,255 @@
+# replay.py
+# -------------------------
+# Ghi lại ván chơi dạng nhị phân gọn và đọc lại có thể tua tới tick bất kỳ
+# Ví dụ: python -m envs.replay recordings/mediumClassic-....pmr --tick 120
+# -------------------------
+import argparse
+import bisect
+import os
+import struct
+import sys
+import time
+import zlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from envs.game_state import GameState
+from envs.game_engine import GameEngine
+from envs.state_codec import (
+    encode_layout, decode_layout, encode_state, decode_state,
+    encode_direction, decode_direction
+)
+
+MAGIC = b"PMRP"
+FORMAT_VERSION = 1
+DEFAULT_KEYFRAME_INTERVAL = 100
+
+# header: version, keyframe interval, số seed
+_HEADER = struct.Struct("<HHH")
+_SEED = struct.Struct("<Bq")
+_BLOCK = struct.Struct("<I")
+
+# bản ghi: tag (1 byte) + tick
+TAG_KEYFRAME = ord("K")    # + u32 độ dài + state nén zlib
+TAG_TURN = ord("T")        # + agent, action
+TAG_JOINT = ord("J")       # + số cặp, các cặp (agent, action)
+_TAG_TICK = struct.Struct("<BI")
+_PAIR = struct.Struct("<BB")
+
+
+class GameRecorder:
+    """Ghi layout ban đầu, seed, luồng action theo tick và keyframe định kỳ.
+
+    Mỗi tick chỉ tốn vài byte (1 byte cho mỗi action); keyframe là toàn bộ
+    state mã hóa bằng state_codec và nén zlib, ghi mỗi keyframe_interval tick.
+    """
+
+    def __init__(self, path: str, initial_state: GameState, map_name: str = "",
+                 seeds: dict = None, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.tick = 0
+        self._file = open(path, "wb")
+
+        seeds = seeds or {}
+        name = map_name.encode("utf-8")
+        layout = encode_layout(initial_state.layout)
+        parts = [MAGIC, _HEADER.pack(FORMAT_VERSION, self.keyframe_interval, len(seeds))]
+        parts += [_SEED.pack(int(agent), int(seed)) for agent, seed in sorted(seeds.items())]
+        parts += [_BLOCK.pack(len(name)), name, _BLOCK.pack(len(layout)), layout]
+        self._file.write(b"".join(parts))
+        self._write_keyframe(initial_state)
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def _write_keyframe(self, state: GameState):
+        payload = zlib.compress(encode_state(state))
+        self._file.write(_TAG_TICK.pack(TAG_KEYFRAME, self.tick) + _BLOCK.pack(len(payload)) + payload)
+        self._file.flush()
+
+    def _end_tick(self, state: GameState):
+        if self.tick % self.keyframe_interval == 0 or state.win or state.lose:
+            self._write_keyframe(state)
+
+    def record_action(self, agent_idx: int, action, state_after: GameState):
+        if self._file is None:
+            return
+        self.tick += 1
+        self._file.write(_TAG_TICK.pack(TAG_TURN, self.tick) + _PAIR.pack(agent_idx, encode_direction(action)))
+        self._end_tick(state_after)
+
+    def record_joint_action(self, actions, state_after: GameState):
+        if self._file is None:
+            return
+        if not isinstance(actions, dict):
+            actions = dict(enumerate(actions))
+        self.tick += 1
+        pairs = b"".join(_PAIR.pack(a, encode_direction(act)) for a, act in sorted(actions.items()))
+        self._file.write(_TAG_TICK.pack(TAG_JOINT, self.tick) + bytes([len(actions)]) + pairs)
+        self._end_tick(state_after)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ReplayReader:
+    """Đọc file replay; state_at(tick) khôi phục keyframe gần nhất rồi áp dụng lại action qua GameEngine."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = f.read()
+        data = self._data
+        if data[:4] != MAGIC:
+            raise ValueError(f"Not a Pacman replay file: {path}")
+
+        offset = 4
+        version, self.keyframe_interval, num_seeds = _HEADER.unpack_from(data, offset)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+        offset += _HEADER.size
+        self.seeds = {}
+        for _ in range(num_seeds):
+            agent, seed = _SEED.unpack_from(data, offset)
+            self.seeds[agent] = seed
+            offset += _SEED.size
+        (n,) = _BLOCK.unpack_from(data, offset)
+        offset += _BLOCK.size
+        self.map_name = data[offset:offset + n].decode("utf-8")
+        offset += n
+        (n,) = _BLOCK.unpack_from(data, offset)
+        offset += _BLOCK.size
+        self.layout = decode_layout(data[offset:offset + n])
+        offset += n
+
+        # chỉ mục: action theo tick, vị trí keyframe theo tick
+        self.actions = []      # (tick, joint, {agent: action})
+        self.keyframes = []    # (tick, offset payload, độ dài)
+        while offset < len(data):
+            if len(data) - offset < _TAG_TICK.size:
+                break  # bản ghi cuối bị cắt (ván đang ghi dở)
+            tag, tick = _TAG_TICK.unpack_from(data, offset)
+            offset += _TAG_TICK.size
+            if tag == TAG_KEYFRAME:
+                (n,) = _BLOCK.unpack_from(data, offset)
+                offset += _BLOCK.size
+                if offset + n > len(data):
+                    break
+                self.keyframes.append((tick, offset, n))
+                offset += n
+            elif tag == TAG_TURN:
+                agent, code = _PAIR.unpack_from(data, offset)
+                offset += _PAIR.size
+                self.actions.append((tick, False, {agent: decode_direction(code)}))
+            elif tag == TAG_JOINT:
+                count = data[offset]
+                offset += 1
+                pairs = {}
+                for _ in range(count):
+                    agent, code = _PAIR.unpack_from(data, offset)
+                    pairs[agent] = decode_direction(code)
+                    offset += _PAIR.size
+                self.actions.append((tick, True, pairs))
+            else:
+                raise ValueError(f"Corrupt replay record at byte {offset - _TAG_TICK.size}")
+        if not self.keyframes:
+            raise ValueError(f"Replay has no initial keyframe: {path}")
+        self._keyframe_ticks = [k[0] for k in self.keyframes]
+        self._action_ticks = [a[0] for a in self.actions]
+
+    @property
+    def num_ticks(self) -> int:
+        return self.actions[-1][0] if self.actions else 0
+
+    def _keyframe(self, i: int) -> GameState:
+        _, offset, n = self.keyframes[i]
+        return decode_state(zlib.decompress(self._data[offset:offset + n]), self.layout)
+
+    def _nearest_keyframe(self, tick: int) -> int:
+        return max(0, bisect.bisect_right(self._keyframe_ticks, tick) - 1)
+
+    def _first_action_after(self, tick: int) -> int:
+        return bisect.bisect_right(self._action_ticks, tick)
+
+    @staticmethod
+    def apply(state: GameState, record):
+        _, joint, actions = record
+        if joint:
+            GameEngine.apply_joint_action(state, actions)
+        else:
+            for agent, action in actions.items():
+                GameEngine.apply_action(state, agent, action)
+
+    def state_at(self, tick: int) -> GameState:
+        """State sau khi áp dụng mọi action có tick <= tick."""
+        tick = max(0, min(int(tick), self.num_ticks))
+        k = self._nearest_keyframe(tick)
+        state = self._keyframe(k)
+        start = self._first_action_after(self.keyframes[k][0])
+        end = self._first_action_after(tick)
+        for record in self.actions[start:end]:
+            self.apply(state, record)
+        return state
+
+    def frames(self, start: int = 0, end: int = None):
+        """Sinh lần lượt (tick, state) từ start đến end; state được cập nhật tại chỗ."""
+        end = self.num_ticks if end is None else min(end, self.num_ticks)
+        state = self.state_at(start)
+        yield start, state
+        for record in self.actions[self._first_action_after(start):self._first_action_after(end)]:
+            self.apply(state, record)
+            yield record[0], state
+
+    def play(self, display=None, start: int = 0, end: int = None) -> GameState:
+        """Phát lại: không có display thì chạy headless nhanh nhất có thể, ngược lại qua BaseDisplay."""
+        state = None
+        for tick, state in self.frames(start, end):
+            if display is None:
+                continue
+            if tick == start:
+                display.initialize(state)
+            else:
+                display.update(state)
+            if display.frame_time > 0:
+                time.sleep(display.frame_time)
+        if display is not None:
+            display.finish()
+        return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or play back a Pacman replay (.pmr)")
+    parser.add_argument("path")
+    parser.add_argument("--tick", type=int, default=None, help="print the state at this tick")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("--show", action="store_true", help="play back in the Tk window")
+    parser.add_argument("--frame-time", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    reader = ReplayReader(args.path)
+    print(f"[Replay] {args.path}: map={reader.map_name or '?'} ticks={reader.num_ticks} "
+          f"keyframes={len(reader.keyframes)} size={os.path.getsize(args.path)}B")
+    if args.tick is not None:
+        state = reader.state_at(args.tick)
+        print(f"[Replay] tick {args.tick}: score={state.score} food={state.getNumFood()} "
+              f"pacman=({state.pacman.x}, {state.pacman.y}) win={state.win} lose={state.lose}")
+        return
+
+    display = None
+    if args.show:
+        from ui.tkinter_ui import TkinterDisplay
+        display = TkinterDisplay(zoom=1.5, frame_time=args.frame_time, title="Pacman Replay")
+    state = reader.play(display, args.start, args.end)
+    print(f"[Replay] final: score={state.score} win={state.win} lose={state.lose}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# shm_transport.py
+# -------------------------
+# Đường truyền shared memory cho worker chạy cùng máy với backend.
+# Một block multiprocessing.shared_memory cho mỗi phòng gồm:
+#   header (seqlock + version, tick, lượt, zobrist) | lưới object_matrix uint8
+#   | mặt phẳng bit food + capsule | agents (encode_agents)
+#   | mỗi agent một ring action một-ghi-một-đọc (worker ghi, backend đọc).
+# Kích thước các vùng tính theo layout + số agent của phòng và ghi trong header.
+# Reader dựng GameState từ mặt phẳng bit + zobrist có sẵn, không quét lại lưới.
+# Seqlock: writer tăng seq lên lẻ, ghi dữ liệu, tăng lên chẵn; reader đọc lại nếu seq đổi.
+# -------------------------
+import threading
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+from envs.game_state import GameState, AgentInfo, GhostInfo, ghost_fields
+from envs.static_layout import StaticLayout
+from envs.state_codec import encode_agents, decode_agents, encode_direction, decode_direction
+from envs.wire_protocol import NO_AGENT
+from envs import bitplane
+
+RING_SIZE = 16
+SPIN_ITERATIONS = 2000      # số vòng sleep(0) trước khi chuyển sang ngủ thật
+IDLE_SLEEP = 0.0005
+
+# giá trị cờ closed trong header
+OPEN = 0
+CLOSED = 1
+REPLACED = 2    # block được tạo lại với kích thước khác (load_map): reader gắn lại ngay
+
+_HEADER_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("zobrist", "<u8"),
+    ("version", "<u4"),
+    ("tick", "<u4"),
+    ("current_turn", "u1"),
+    ("joint", "u1"),
+    ("closed", "u1"),
+    ("height", "<u2"),
+    ("width", "<u2"),
+    ("layout_id", "<u4"),   # đổi khi layout tĩnh đổi (load_map)
+    ("agents_len", "<u4"),
+    # kích thước các vùng, cố định suốt đời block
+    ("grid_capacity", "<u4"),
+    ("agents_capacity", "<u4"),
+    ("max_agents", "<u2")
+], align=True)
+_RING_DTYPE = np.dtype([
+    ("head", "<u4"),    # worker ghi
+    ("tail", "<u4"),    # backend ghi
+    ("tick", "<u4", (RING_SIZE,)),
+    ("code", "u1", (RING_SIZE,))
+], align=True)
+
+_GRID_OFFSET = 64
+assert _HEADER_DTYPE.itemsize <= _GRID_OFFSET
+
+_U32 = 0xFFFFFFFF
+
+
+def block_name(port: int, room: str) -> str:
+    return f"pacman-{port}-{room}"
+
+
+def _idle(count: int):
+    # chờ bận ngắn để bắt kịp tick kế tiếp trong vài µs, sau đó nhường CPU
+    time.sleep(0 if count < SPIN_ITERATIONS else IDLE_SLEEP)
+
+
+def _align(n: int, k: int = 8) -> int:
+    return (n + k - 1) // k * k
+
+
+class _Block:
+    """Một block shared memory; offset các vùng tính từ capacity ghi trong header."""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.header = np.ndarray(1, dtype=_HEADER_DTYPE, buffer=shm.buf)
+        self.seq = self.header["seq"]
+        self.grid_capacity = int(self.header["grid_capacity"][0])
+        self.agents_capacity = int(self.header["agents_capacity"][0])
+        self.max_agents = int(self.header["max_agents"][0])
+        self.plane_capacity = (self.grid_capacity + 7) // 8
+        self.planes_offset = _align(_GRID_OFFSET + self.grid_capacity)
+        self.agents_offset = _align(self.planes_offset + 2 * self.plane_capacity)
+        rings_offset = _align(self.agents_offset + self.agents_capacity)
+        self.rings = np.ndarray(self.max_agents, dtype=_RING_DTYPE, buffer=shm.buf, offset=rings_offset)
+
+    @staticmethod
+    def size(grid_capacity: int, agents_capacity: int, max_agents: int) -> int:
+        planes = _align(_GRID_OFFSET + grid_capacity)
+        agents = _align(planes + 2 * ((grid_capacity + 7) // 8))
+        return _align(agents + agents_capacity) + max_agents * _RING_DTYPE.itemsize
+
+    @classmethod
+    def create(cls, name: str, grid_capacity: int, agents_capacity: int, max_agents: int) -> "_Block":
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=cls.size(grid_capacity, agents_capacity, max_agents)
+        )
+        header = np.ndarray(1, dtype=_HEADER_DTYPE, buffer=shm.buf)
+        header["grid_capacity"] = grid_capacity
+        header["agents_capacity"] = agents_capacity
+        header["max_agents"] = max_agents
+        del header
+        return cls(shm)
+
+    def fits(self, cells: int, agents_len: int) -> bool:
+        return cells <= self.grid_capacity and agents_len <= self.agents_capacity
+
+    def mark_closed(self, flag: int):
+        self.seq[0] += 1
+        self.header["closed"] = flag
+        self.seq[0] += 1
+
+    def release(self):
+        # view numpy phải được bỏ trước khi đóng mmap
+        self.header = self.seq = self.rings = None
+        self.shm.close()
+
+
+class SharedStatePublisher:
+    """Phía backend: ghi state mỗi tick và gom action từ ring của các worker.
+
+    Block được cấp đúng kích thước cho layout và số agent của phòng; state không vừa
+    (load_map sang map lớn hơn) thì block được tạo lại và reader cũ được báo REPLACED.
+    """
+
+    def __init__(self, name: str, state: GameState, num_agents: int):
+        self.name = name
+        self.num_agents = num_agents
+        self._lock = threading.Lock()   # giữa publish (thread tick) và drain (thread poll)
+        self._block = self._create(state)
+        self._thread = None
+        self._stop = threading.Event()
+        self._layout = None
+        self._layout_id = 0
+
+    def _create(self, state: GameState) -> _Block:
+        return _Block.create(self.name, state.layout.size, len(encode_agents(state)),
+                             max(self.num_agents, 1 + state.num_ghosts()))
+
+    def publish(self, state: GameState, version: int, tick: int, current_turn, joint: bool):
+        grid = state.object_matrix
+        H, W = grid.shape
+        agents = encode_agents(state)
+        with self._lock:
+            block = self._block
+            if not block.fits(H * W, len(agents)):
+                block.mark_closed(REPLACED)
+                block.release()
+                block.shm.unlink()
+                block = self._block = self._create(state)
+            buf = block.shm.buf
+            if state.layout is not self._layout:
+                self._layout = state.layout
+                self._layout_id += 1
+            plane = len(state.food)
+            block.seq[0] += 1
+            h = block.header
+            h["zobrist"] = state.zobrist
+            h["layout_id"] = self._layout_id
+            h["version"] = version
+            h["tick"] = tick
+            h["current_turn"] = NO_AGENT if current_turn is None else current_turn
+            h["joint"] = joint
+            h["height"] = H
+            h["width"] = W
+            h["agents_len"] = len(agents)
+            np.ndarray((H, W), dtype=np.uint8, buffer=buf, offset=_GRID_OFFSET)[:] = grid
+            food_at, capsules_at = block.planes_offset, block.planes_offset + block.plane_capacity
+            buf[food_at:food_at + plane] = state.food.tobytes()
+            buf[capsules_at:capsules_at + plane] = state.capsules.tobytes()
+            buf[block.agents_offset:block.agents_offset + len(agents)] = agents
+            block.seq[0] += 1
+
+    def drain(self):
+        """Lấy mọi action mới: list (agent, action, tick)."""
+        actions = []
+        with self._lock:
+            rings = self._block.rings
+            heads = rings["head"].copy()
+            tails = rings["tail"]
+            for agent_idx in np.flatnonzero(heads != tails).tolist():
+                head, tail = int(heads[agent_idx]), int(tails[agent_idx])
+                for i in range(min((head - tail) & _U32, RING_SIZE)):
+                    slot = (tail + i) % RING_SIZE
+                    code, tick = int(rings["code"][agent_idx, slot]), int(rings["tick"][agent_idx, slot])
+                    actions.append((agent_idx, decode_direction(code, "Stop"), tick))
+                tails[agent_idx] = head
+        return actions
+
+    def start_polling(self, submit):
+        """submit(agent, action, tick) được gọi từ thread riêng cho mỗi action đọc được."""
+        def loop():
+            idle = 0
+            while not self._stop.is_set():
+                actions = self.drain()
+                for agent_idx, action, tick in actions:
+                    submit(agent_idx, action, tick)
+                idle = 0 if actions else idle + 1
+                _idle(idle)
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            block = self._block
+            block.mark_closed(CLOSED)
+            block.release()
+            block.shm.unlink()
+
+
+class SharedStateReader:
+    """Phía worker: đọc state nhất quán theo seqlock (lưới là view numpy, không copy) và gửi action."""
+
+    def __init__(self, name: str):
+        shm = shared_memory.SharedMemory(name=name)
+        # block thuộc về backend: không để resource_tracker của worker unlink khi thoát
+        resource_tracker.unregister(shm._name, "shared_memory")
+        self.name = name
+        self._block = _Block(shm)
+        if not self._block.max_agents:
+            # backend chưa ghi xong header của block vừa tạo
+            self._block.release()
+            raise FileNotFoundError(name)
+        self._layout = None
+        self._layout_id = None
+        self._food_key = None
+        self._food_positions = set()
+        self._num_food = 0
+
+    @property
+    def seq(self) -> int:
+        return int(self._block.seq[0])
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._block.header["closed"][0])
+
+    def wait(self, last_seq: int, timeout: float = 1.0) -> bool:
+        """Chờ tới khi có bản ghi hoàn chỉnh mới hơn last_seq."""
+        deadline = time.monotonic() + timeout
+        idle = 0
+        while True:
+            seq = self.seq
+            if seq != last_seq and not seq & 1:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            idle += 1
+            _idle(idle)
+
+    def read(self):
+        """-> (seq, info dict cùng khóa với message state, GameState).
+
+        Bản ghi được kiểm tra lại seq sau khi dựng state; đọc trúng lúc writer đang ghi thì thử lại.
+        Layout dựng từ lưới chỉ được giữ lại cache khi bản ghi đã được xác nhận nhất quán.
+        """
+        idle = 0
+        while True:
+            seq = self.seq
+            if not seq & 1:
+                try:
+                    info, state, layout_id = self._snapshot()
+                except (ValueError, TypeError, IndexError, KeyError):
+                    if self.seq == seq:
+                        raise
+                    state = None
+                if state is not None and self.seq == seq:
+                    if layout_id != self._layout_id:
+                        self._layout = state.layout
+                        self._layout_id = layout_id
+                    return seq, info, state
+            idle += 1
+            _idle(idle)
+
+    def grid(self) -> np.ndarray:
+        """View (không copy) của object_matrix đang publish; chỉ hợp lệ tới lần publish kế tiếp."""
+        H, W = int(self._block.header["height"][0]), int(self._block.header["width"][0])
+        if H * W > self._block.grid_capacity:
+            raise ValueError("torn header")
+        return np.ndarray((H, W), dtype=np.uint8, buffer=self._block.shm.buf, offset=_GRID_OFFSET)
+
+    def _snapshot(self):
+        # -> (info, state, layout_id); chưa ghi gì vào cache layout, read() xác nhận seq trước
+        block = self._block
+        buf = block.shm.buf
+        header = block.header[0]
+        zobrist, version, tick, turn, joint, closed, layout_id = (
+            header["zobrist"], header["version"], header["tick"], header["current_turn"],
+            header["joint"], header["closed"], header["layout_id"]
+        )
+        layout_id = int(layout_id)
+        layout = self._layout if layout_id == self._layout_id else StaticLayout.from_object_matrix(self.grid())
+        plane = (layout.size + 7) // 8
+        food = np.frombuffer(buf, dtype=np.uint8, count=plane, offset=block.planes_offset).copy()
+        capsules = np.frombuffer(buf, dtype=np.uint8, count=plane,
+                                 offset=block.planes_offset + block.plane_capacity).copy()
+        agents = decode_agents(buf, block.agents_offset)
+        # food chỉ đổi khi Pacman ăn: chỉ mục food dùng lại giữa các tick (copy-on-write như GameState.copy).
+        # Khóa gồm layout và chính các byte đã copy nên bản ghi rách không làm hỏng cache.
+        food_key = (layout, food.tobytes())
+        if food_key != self._food_key:
+            W = layout.width
+            self._food_positions = {
+                (int(i % W), int(i // W)) for i in bitplane.indices(food, layout.size)
+            }
+            self._num_food = bitplane.popcount(food)
+            self._food_key = food_key
+        state = GameState(
+            layout=layout,
+            food=food,
+            capsules=capsules,
+            pacman=AgentInfo(**agents["pacman"]),
+            **ghost_fields([GhostInfo(**g) for g in agents["ghosts"]]),
+            score=agents["score"],
+            win=agents["win"],
+            lose=agents["lose"],
+            num_food=self._num_food,
+            food_positions=self._food_positions,
+            zobrist=int(zobrist),
+            shared_planes=True
+        )
+        info = {
+            "version": int(version),
+            "tick": int(tick),
+            "current_turn": None if turn == NO_AGENT else int(turn),
+            "joint": bool(joint),
+            "closed": bool(closed != OPEN),
+            "replaced": bool(closed == REPLACED)
+        }
+        return info, state, layout_id
+
+    def post_action(self, agent_idx: int, action, tick: int) -> bool:
+        if not 0 <= agent_idx < self._block.max_agents:
+            raise ValueError(f"agent {agent_idx} out of range for shared memory block '{self.name}' "
+                             f"({self._block.max_agents} agents)")
+        rings = self._block.rings
+        head = int(rings["head"][agent_idx])
+        if (head - int(rings["tail"][agent_idx])) & _U32 >= RING_SIZE:
+            return False
+        slot = head % RING_SIZE
+        rings["tick"][agent_idx, slot] = tick
+        rings["code"][agent_idx, slot] = encode_direction(action)
+        rings["head"][agent_idx] = (head + 1) & _U32
+        return True
+
+    def close(self):
+        self._block.release()
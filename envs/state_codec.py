@@ -0,0 +1,116 @@
+# state_codec.py
+# -------------------------
+# Mã hóa nhị phân gọn cho layout tĩnh và GameState (dùng cho replay / wire protocol)
+# -------------------------
+import struct
+import zlib
+import numpy as np
+
+from envs.game_state import GameState, AgentInfo
+from envs.static_layout import StaticLayout
+from envs.topology import DIRECTION_ORDER, DIRECTION_INDEX
+
+NO_DIRECTION = 255
+
+_LAYOUT_HEADER = struct.Struct("<HH")          # height, width
+_STATE_HEADER = struct.Struct("<dBHHBHI")      # score, flags, pac x, pac y, pac dir, num ghosts, plane bytes
+_AGENTS_HEADER = struct.Struct("<dBHHBH")      # như trên, không có mặt phẳng food
+_GHOST_DTYPE = np.dtype([("x", "<u2"), ("y", "<u2"), ("dir", "u1"), ("scared", "<u2")])
+
+FLAG_WIN = 1
+FLAG_LOSE = 2
+
+
+def encode_direction(direction) -> int:
+    return DIRECTION_INDEX.get(direction, NO_DIRECTION)
+
+
+def decode_direction(code: int, default=None):
+    return DIRECTION_ORDER[code] if code < len(DIRECTION_ORDER) else default
+
+
+def encode_layout(layout: StaticLayout, compress: bool = True) -> bytes:
+    raw = layout.static_matrix.tobytes()
+    if compress:
+        raw = zlib.compress(raw)
+    return _LAYOUT_HEADER.pack(layout.height, layout.width) + raw
+
+
+def decode_layout(buf: bytes, compressed: bool = True) -> StaticLayout:
+    H, W = _LAYOUT_HEADER.unpack_from(buf, 0)
+    raw = bytes(buf[_LAYOUT_HEADER.size:])
+    if compressed:
+        raw = zlib.decompress(raw)
+    return StaticLayout.intern(np.frombuffer(raw, dtype=np.uint8).reshape(H, W))
+
+
+def _flags(state: GameState) -> int:
+    return (FLAG_WIN if state.win else 0) | (FLAG_LOSE if state.lose else 0)
+
+
+def _pack_ghosts(state: GameState) -> np.ndarray:
+    ghosts = np.empty(state.num_ghosts(), dtype=_GHOST_DTYPE)
+    ghosts["x"] = state.ghost_xy[:, 0]
+    ghosts["y"] = state.ghost_xy[:, 1]
+    ghosts["dir"] = [encode_direction(d) for d in state.ghost_dirs]
+    ghosts["scared"] = state.scared
+    return ghosts
+
+
+def encode_agents(state: GameState) -> bytes:
+    """Phần thay đổi mỗi tick: điểm, cờ, struct Pacman + mảng struct ghost."""
+    header = _AGENTS_HEADER.pack(
+        float(state.score), _flags(state), int(state.pacman.x), int(state.pacman.y),
+        encode_direction(state.pacman.dir), state.num_ghosts()
+    )
+    return header + _pack_ghosts(state).tobytes()
+
+
+def decode_agents(buf, offset: int = 0) -> dict:
+    """Trả về dict cùng dạng serialize_agents."""
+    score, flags, px, py, pdir, G = _AGENTS_HEADER.unpack_from(buf, offset)
+    ghosts = np.frombuffer(buf, dtype=_GHOST_DTYPE, count=G, offset=offset + _AGENTS_HEADER.size)
+    return {
+        "pacman": {"x": px, "y": py, "dir": decode_direction(pdir, "East")},
+        "ghosts": [
+            {"x": x, "y": y, "dir": decode_direction(d, "East"), "scared_timer": t}
+            for x, y, d, t in ghosts.tolist()
+        ],
+        "score": score,
+        "win": bool(flags & FLAG_WIN),
+        "lose": bool(flags & FLAG_LOSE)
+    }
+
+
+def encode_state(state: GameState) -> bytes:
+    """Food / capsule dạng mặt phẳng bit + struct Pacman + mảng struct ghost."""
+    flags = _flags(state)
+    G = state.num_ghosts()
+    ghosts = _pack_ghosts(state)
+    header = _STATE_HEADER.pack(
+        float(state.score), flags, int(state.pacman.x), int(state.pacman.y),
+        encode_direction(state.pacman.dir), G, state.food.nbytes
+    )
+    return b"".join((header, state.food.tobytes(), state.capsules.tobytes(), ghosts.tobytes()))
+
+
+def decode_state(buf, layout: StaticLayout) -> GameState:
+    score, flags, px, py, pdir, G, plane = _STATE_HEADER.unpack_from(buf, 0)
+    offset = _STATE_HEADER.size
+    food = np.frombuffer(buf, dtype=np.uint8, count=plane, offset=offset).copy()
+    offset += plane
+    capsules = np.frombuffer(buf, dtype=np.uint8, count=plane, offset=offset).copy()
+    offset += plane
+    ghosts = np.frombuffer(buf, dtype=_GHOST_DTYPE, count=G, offset=offset)
+    return GameState(
+        layout=layout,
+        food=food,
+        capsules=capsules,
+        pacman=AgentInfo(px, py, decode_direction(pdir, "East")),
+        ghost_xy=np.stack([ghosts["x"], ghosts["y"]], axis=1).astype(np.int32),
+        ghost_dirs=[decode_direction(d, "East") for d in ghosts["dir"].tolist()],
+        scared=ghosts["scared"].astype(np.int32),
+        score=score,
+        win=bool(flags & FLAG_WIN),
+        lose=bool(flags & FLAG_LOSE)
+    )
@@ -0,0 +1,128 @@
+# state_delta.py
+# -------------------------
+# Version + delta cho state gửi qua mạng: server ghi các ô thay đổi theo version,
+# client giữ bản mirror và áp dụng patch thay vì nhận lại toàn bộ object_matrix
+# -------------------------
+from collections import deque
+import numpy as np
+
+from envs import layouts
+from envs import bitplane
+from envs.game_state import GameState, serialize_agents
+
+DEFAULT_HISTORY = 256
+
+
+def cell_values(state: GameState, cells: np.ndarray) -> np.ndarray:
+    """Giá trị object_matrix tại các ô (chỉ số phẳng) mà không dựng cả ma trận."""
+    values = state.layout.static_matrix.ravel()[cells].copy()
+    values[bitplane.test_many(state.food, cells)] = layouts.FOOD
+    values[bitplane.test_many(state.capsules, cells)] = layouts.CAPSULE
+    return values
+
+
+class StateJournal:
+    """Bộ đếm version tăng dần và lịch sử ô thay đổi của history version gần nhất.
+
+    commit() gọi sau mỗi tick; version chỉ tăng khi state thật sự đổi. reset()
+    (map mới) mở epoch mới, client cũ hơn phải nhận lại snapshot đầy đủ.
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY, max_cells: int = None):
+        self.version = 0
+        self.max_cells = max_cells
+        self._entries = deque(maxlen=history)  # (version, chỉ số ô thay đổi)
+        self._base = 0  # delta chỉ trả được cho since >= _base
+        self._layout = None
+        self._food = None
+        self._capsules = None
+        self._signature = None
+
+    @staticmethod
+    def signature(state: GameState):
+        return (state.zobrist, state.score, state.win, state.lose,
+                state.pacman.dir, tuple(state.ghost_dirs))
+
+    def _remember(self, state: GameState):
+        self._layout = state.layout
+        self._food = state.food.copy()
+        self._capsules = state.capsules.copy()
+        self._signature = self.signature(state)
+
+    def reset(self, state: GameState) -> int:
+        self.version += 1
+        self._entries.clear()
+        self._base = self.version
+        self._remember(state)
+        return self.version
+
+    def commit(self, state: GameState) -> int:
+        if state.layout is not self._layout or len(state.food) != len(self._food):
+            return self.reset(state)
+        signature = self.signature(state)
+        if signature == self._signature:
+            return self.version
+
+        diff = (self._food ^ state.food) | (self._capsules ^ state.capsules)
+        changed = np.flatnonzero(diff)
+        rows, bits = np.nonzero(np.unpackbits(diff[changed]).reshape(-1, 8))
+        cells = changed[rows] * 8 + bits
+
+        self.version += 1
+        if len(self._entries) == self._entries.maxlen:
+            self._base = self._entries[0][0]
+        self._entries.append((self.version, cells))
+        self._remember(state)
+        return self.version
+
+    def changed_cells(self, since: int):
+        """Các ô thay đổi sau version since, hoặc None nếu không còn đủ lịch sử."""
+        if since is None or since < self._base or since > self.version:
+            return None
+        chunks = [cells for version, cells in self._entries if version > since]
+        if not chunks:
+            return np.zeros(0, dtype=np.int64)
+        cells = np.unique(np.concatenate(chunks))
+        if self.max_cells is not None and len(cells) > self.max_cells:
+            return None
+        return cells
+
+    def delta_since(self, since: int, state: GameState):
+        cells = self.changed_cells(since)
+        if cells is None:
+            return None
+        return serialize_delta(state, cells)
+
+
+def serialize_delta(state: GameState, cells: np.ndarray) -> dict:
+    W = state.layout.width
+    values = cell_values(state, cells)
+    return {
+        "cells": [[c % W, c // W, v] for c, v in zip(cells.tolist(), values.tolist())],
+        **serialize_agents(state)
+    }
+
+
+def apply_delta(state: GameState, delta: dict) -> GameState:
+    """Áp dụng delta lên bản mirror (tại chỗ) qua các mutator để giữ đúng bộ đếm / zobrist."""
+    for x, y, value in delta["cells"]:
+        if state.is_food(x, y) != (value == layouts.FOOD):
+            if value == layouts.FOOD:
+                state.add_food(x, y)
+            else:
+                state.remove_food(x, y)
+        if state.is_capsule(x, y) != (value == layouts.CAPSULE):
+            if value == layouts.CAPSULE:
+                state.add_capsule(x, y)
+            else:
+                state.remove_capsule(x, y)
+
+    pac = delta["pacman"]
+    state.move_pacman_to(pac["x"], pac["y"], pac["dir"])
+    ghosts = delta["ghosts"]
+    state.set_ghost_positions([[g["x"], g["y"]] for g in ghosts], [g["dir"] for g in ghosts])
+    state.set_scared_timers([g["scared_timer"] for g in ghosts])
+    state.score = delta["score"]
+    state.win = delta["win"]
+    state.lose = delta["lose"]
+    return state
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import numpy as np
+
+from envs import layouts
+from envs.topology import MapTopology
+
+
+def layout_key(static_matrix: np.ndarray) -> str:
+    digest = hashlib.sha1()
+    digest.update(np.asarray(static_matrix.shape, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(static_matrix, dtype=np.uint8).tobytes())
+    return digest.hexdigest()
+
+
+class StaticLayout:
+    """Phần tĩnh của bản đồ (tường, điểm spawn), dùng chung cho mọi GameState."""
+
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, static_matrix: np.ndarray, neighbors: np.ndarray = None):
+        static_matrix = np.array(static_matrix, dtype=np.uint8)
+        static_matrix.setflags(write=False)
+        self.static_matrix = static_matrix
+        self.height, self.width = static_matrix.shape
+        self.shape = static_matrix.shape
+        self.size = self.height * self.width
+
+        walls = static_matrix == layouts.WALL
+        walls.setflags(write=False)
+        self.walls = walls
+        self.topology = MapTopology(walls, neighbors)
+
+        # điểm spawn ghost lấy từ marker GHOSTn trong map, theo id rồi theo thứ tự quét
+        ys, xs = np.nonzero(static_matrix >= layouts.GHOST1)
+        order = np.lexsort((ys * self.width + xs, static_matrix[ys, xs]))
+        ghost_spawns = np.stack([xs[order], ys[order]], axis=1).astype(np.int32)
+        ghost_spawns.setflags(write=False)
+        self.ghost_spawns = ghost_spawns
+        self.key = layout_key(static_matrix)
+
+    @classmethod
+    def intern(cls, static_matrix: np.ndarray, neighbors: np.ndarray = None) -> "StaticLayout":
+        static_matrix = np.asarray(static_matrix, dtype=np.uint8)
+        key = layout_key(static_matrix)
+        with cls._cache_lock:
+            layout = cls._cache.get(key)
+        if layout is None:
+            layout = cls(static_matrix, neighbors)
+            with cls._cache_lock:
+                layout = cls._cache.setdefault(key, layout)
+        return layout
+
+    @classmethod
+    def from_object_matrix(cls, object_matrix: np.ndarray) -> "StaticLayout":
+        m = np.asarray(object_matrix)
+        static_matrix = np.where(
+            (m == layouts.FOOD) | (m == layouts.CAPSULE), layouts.EMPTY, m
+        ).astype(np.uint8)
+        return cls.intern(static_matrix)
+
+    def get_ghost_spawn(self, ghost_idx: int):
+        if len(self.ghost_spawns) == 0:
+            return 1, 1
+        x, y = self.ghost_spawns[ghost_idx % len(self.ghost_spawns)].tolist()
+        return x, y
+
+    def cell_index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
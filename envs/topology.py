@@ -0,0 +1,69 @@
+import numpy as np
+
+from envs.directions import Actions
+
+# Thứ tự hướng cố định (North, South, East, West) dùng cho mọi bảng tra
+DIRECTION_ORDER = [direction for direction, _ in Actions._directionsAsList]
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTION_ORDER)}
+
+# 16 tổ hợp hướng hợp lệ -> tuple action, dùng chung cho mọi ô
+_ACTIONS_BY_MASK = [
+    tuple(d for i, d in enumerate(DIRECTION_ORDER) if mask & (1 << i))
+    for mask in range(1 << len(DIRECTION_ORDER))
+]
+
+
+class MapTopology:
+    """Bảng tra tĩnh theo ô: bitmask action hợp lệ, ô kề và danh sách action."""
+
+    def __init__(self, walls: np.ndarray, neighbors: np.ndarray = None):
+        H, W = walls.shape
+        self.height, self.width = H, W
+
+        if neighbors is None:
+            neighbors = MapTopology.build_neighbors(walls)
+        neighbors = np.array(neighbors, dtype=np.int32)
+        legal_mask = np.zeros(H * W, dtype=np.uint8)
+        for i in range(len(DIRECTION_ORDER)):
+            legal_mask |= (neighbors[:, i] >= 0).astype(np.uint8) << i
+
+        neighbors.setflags(write=False)
+        legal_mask.setflags(write=False)
+        self.neighbors = neighbors
+        self.legal_mask = legal_mask
+
+        # bản sao dạng list Python cho đường đi nóng (đọc phần tử đơn lẻ nhanh hơn numpy)
+        self.neighbor_lists = neighbors.tolist()
+        self.legal_actions = [_ACTIONS_BY_MASK[m] for m in legal_mask.tolist()]
+
+    @staticmethod
+    def build_neighbors(walls: np.ndarray) -> np.ndarray:
+        H, W = walls.shape
+        size = H * W
+        ys, xs = np.divmod(np.arange(size), W)
+        open_cell = ~walls.ravel()
+
+        neighbors = np.full((size, len(DIRECTION_ORDER)), -1, dtype=np.int32)
+        for i, direction in enumerate(DIRECTION_ORDER):
+            dx, dy = Actions.directionToVector(direction)
+            nx, ny = xs + dx, ys + dy
+            ok = (nx >= 0) & (ny >= 0) & (nx < W) & (ny < H)
+            target = np.where(ok, ny * W + nx, 0)
+            ok &= open_cell[target]
+            neighbors[:, i] = np.where(ok, target, -1)
+        return neighbors
+
+    def cell_index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def getLegalActions(self, x: int, y: int):
+        return self.legal_actions[y * self.width + x]
+
+    def next_cell(self, cell: int, action: str) -> int:
+        return self.neighbor_lists[cell][DIRECTION_INDEX[action]]
+
+    def next_position(self, x: int, y: int, action: str):
+        cell = self.neighbor_lists[y * self.width + x][DIRECTION_INDEX[action]]
+        if cell < 0:
+            return None
+        return cell % self.width, cell // self.width
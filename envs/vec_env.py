@@ -0,0 +1,197 @@
+import numpy as np
+
+from envs.game_state import GameState, AgentInfo
+from envs.game_engine import SCARED_TIME
+from envs.topology import DIRECTION_ORDER, DIRECTION_INDEX
+from envs import bitplane
+from config import point
+
+NOOP = -1
+
+
+class VecPacmanEnv:
+    """N ván Pacman chạy song song trên mảng NumPy xếp chồng.
+
+    Mỗi step nhận một joint action (N, 1 + num_ghosts) gồm chỉ số hướng theo
+    DIRECTION_ORDER (hoặc NOOP) và áp dụng đúng luật của GameEngine theo thứ tự
+    Pacman rồi từng ghost. Ván kết thúc được reset tự động về trạng thái đầu.
+    """
+
+    def __init__(self, initial_state: GameState, num_envs: int, auto_reset: bool = True):
+        self.initial_state = initial_state
+        self.num_envs = num_envs
+        self.num_ghosts = initial_state.num_ghosts()
+        self.auto_reset = auto_reset
+
+        layout = initial_state.layout
+        self.layout = layout
+        self.width = layout.width
+        self.size = layout.size
+
+        # bảng di chuyển: ô bị chặn thì đứng yên, cột cuối là NOOP
+        neighbors = layout.topology.neighbors
+        cells = np.arange(self.size, dtype=np.int32)
+        move = np.where(neighbors >= 0, neighbors, cells[:, None])
+        self._move = np.concatenate([move, cells[:, None]], axis=1)
+        self._legal = np.concatenate(
+            [neighbors >= 0, np.zeros((self.size, 1), dtype=bool)], axis=1
+        )
+
+        W = self.width
+        self._init_pac = initial_state.pacman.y * W + initial_state.pacman.x
+        ghost_xy = initial_state.ghost_xy
+        self._init_ghosts = (ghost_xy[:, 1] * W + ghost_xy[:, 0]).astype(np.int32)
+        self._init_scared = initial_state.scared.copy()
+        self._init_food = initial_state.getFood().ravel()
+        self._init_capsules = initial_state.getCapsules().ravel()
+        self._ghost_spawn = np.array(
+            [y * W + x for x, y in (layout.get_ghost_spawn(i) for i in range(self.num_ghosts))],
+            dtype=np.int32
+        )
+
+        N, G = num_envs, self.num_ghosts
+        self.pacman = np.empty(N, dtype=np.int32)
+        self.ghosts = np.empty((N, G), dtype=np.int32)
+        self.scared = np.empty((N, G), dtype=np.int32)
+        self.food = np.empty((N, self.size), dtype=bool)
+        self.capsules = np.empty((N, self.size), dtype=bool)
+        self.remaining = np.empty(N, dtype=np.int32)
+        self.score = np.empty(N, dtype=np.float64)
+        self.win = np.empty(N, dtype=bool)
+        self.lose = np.empty(N, dtype=bool)
+        self.episode_steps = np.empty(N, dtype=np.int64)
+        self.reset()
+
+    @staticmethod
+    def encode_actions(actions) -> np.ndarray:
+        return np.array(
+            [[DIRECTION_INDEX.get(a, NOOP) for a in row] for row in actions],
+            dtype=np.int32
+        )
+
+    def reset(self, mask: np.ndarray = None):
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.pacman[mask] = self._init_pac
+        self.ghosts[mask] = self._init_ghosts
+        self.scared[mask] = self._init_scared
+        self.food[mask] = self._init_food
+        self.capsules[mask] = self._init_capsules
+        self.remaining[mask] = self._init_food.sum() + self._init_capsules.sum()
+        self.score[mask] = self.initial_state.score
+        self.win[mask] = False
+        self.lose[mask] = False
+        self.episode_steps[mask] = 0
+        return self.observe()
+
+    def observe(self, copy: bool = True) -> dict:
+        """Observation của cả N ván.
+
+        copy=False trả về chính các mảng nội bộ (không cấp phát): chúng bị ghi đè tại chỗ
+        ở step() / reset() kế tiếp nên chỉ dùng được tới lúc đó.
+        """
+        arrays = {
+            "pacman": self.pacman,
+            "ghosts": self.ghosts,
+            "scared": self.scared,
+            "food": self.food,
+            "capsules": self.capsules,
+            "score": self.score,
+        }
+        if copy:
+            return {name: a.copy() for name, a in arrays.items()}
+        return arrays
+
+    def legal_actions_mask(self, agent_idx: int = 0) -> np.ndarray:
+        pos = self.pacman if agent_idx == 0 else self.ghosts[:, agent_idx - 1]
+        return self._legal[pos, :len(DIRECTION_ORDER)]
+
+    def _column(self, actions: np.ndarray, k: int) -> np.ndarray:
+        a = actions[:, k]
+        return np.where((a >= 0) & (a < len(DIRECTION_ORDER)), a, len(DIRECTION_ORDER))
+
+    def _collide(self, rows: np.ndarray, ghost_hits: np.ndarray):
+        # ghost_hits: (len(rows), G) theo thứ tự ghost; ghost không sợ đầu tiên -> thua
+        scared = self.scared[rows] > 0
+        deadly = ghost_hits & ~scared
+        any_deadly = deadly.any(axis=1)
+        first_deadly = np.where(any_deadly, deadly.argmax(axis=1), self.num_ghosts)
+        order = np.arange(self.num_ghosts)[None, :]
+        eaten = ghost_hits & scared & (order < first_deadly[:, None])
+
+        r_idx, g_idx = np.nonzero(eaten)
+        self.score[rows[r_idx]] += point.GHOST_EAT_REWARD
+        self.ghosts[rows[r_idx], g_idx] = self._ghost_spawn[g_idx]
+        self.scared[rows[r_idx], g_idx] = 0
+        self.lose[rows[any_deadly]] = True
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int32).reshape(self.num_envs, 1 + self.num_ghosts)
+        prev_score = self.score.copy()
+        # ván đã kết thúc từ trước (auto_reset=False) không đếm thêm bước
+        active = ~(self.win | self.lose)
+        all_rows = np.arange(self.num_envs)
+
+        # Pacman
+        a = self._column(actions, 0)
+        rows = all_rows[~(self.win | self.lose) & self._legal[self.pacman, a]]
+        if rows.size:
+            nxt = self._move[self.pacman[rows], a[rows]]
+            self.pacman[rows] = nxt
+
+            ate_food = self.food[rows, nxt]
+            ate_capsule = ~ate_food & self.capsules[rows, nxt]
+            self.food[rows[ate_food], nxt[ate_food]] = False
+            self.capsules[rows[ate_capsule], nxt[ate_capsule]] = False
+            self.score[rows] += ate_food * point.FOOD_REWARD + ate_capsule * point.CAPSULE_REWARD
+            self.remaining[rows] -= ate_food | ate_capsule
+            self.scared[rows[ate_capsule]] = SCARED_TIME
+
+            self._collide(rows, self.ghosts[rows] == nxt[:, None])
+            self.win[rows] |= ~self.lose[rows] & (self.remaining[rows] == 0)
+
+        # Ghost theo thứ tự index
+        for g in range(self.num_ghosts):
+            a = self._column(actions, g + 1)
+            rows = all_rows[~(self.win | self.lose) & (a < len(DIRECTION_ORDER))]
+            if not rows.size:
+                continue
+            self.ghosts[rows, g] = self._move[self.ghosts[rows, g], a[rows]]
+            timers = self.scared[rows, g]
+            self.scared[rows, g] = np.where(timers > 0, timers - 1, timers)
+
+            hit = self.ghosts[rows, g] == self.pacman[rows]
+            hits = np.zeros((rows.size, self.num_ghosts), dtype=bool)
+            hits[:, g] = hit
+            self._collide(rows, hits)
+
+        self.episode_steps += active
+        rewards = self.score - prev_score
+        dones = self.win | self.lose
+        info = {
+            "win": self.win.copy(),
+            "lose": self.lose.copy(),
+            "final_score": np.where(dones, self.score, np.nan),
+            "episode_steps": self.episode_steps.copy(),
+        }
+        if self.auto_reset and dones.any():
+            self.reset(dones)
+        return self.observe(), rewards, dones, info
+
+    def get_state(self, env_idx: int) -> GameState:
+        W = self.width
+        p = int(self.pacman[env_idx])
+        cells = self.ghosts[env_idx]
+        shape = self.layout.shape
+        return GameState(
+            layout=self.layout,
+            food=bitplane.pack(self.food[env_idx].reshape(shape)),
+            capsules=bitplane.pack(self.capsules[env_idx].reshape(shape)),
+            pacman=AgentInfo(p % W, p // W, self.initial_state.pacman.dir),
+            ghost_xy=np.stack([cells % W, cells // W], axis=1),
+            ghost_dirs=list(self.initial_state.ghost_dirs),
+            scared=self.scared[env_idx].copy(),
+            score=float(self.score[env_idx]),
+            win=bool(self.win[env_idx]),
+            lose=bool(self.lose[env_idx])
+        )
@@ -0,0 +1,172 @@
+# wire_protocol.py
+# -------------------------
+# Giao thức nhị phân có tiền tố độ dài, dùng song song với JSON theo dòng.
+# Client gửi dòng JSON {"type": "hello", "protocol": "binary"}; server trả lời
+# cùng dạng rồi cả hai chuyển sang frame: u32 độ dài payload + u8 loại + payload.
+# -------------------------
+import json
+import struct
+import numpy as np
+
+from envs.game_state import GameState, AgentInfo, GhostInfo
+from envs.state_codec import (
+    encode_agents, decode_agents, encode_direction, decode_direction
+)
+from envs.state_delta import cell_values
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+MSG_JSON = 0        # payload: JSON utf-8 (lệnh điều khiển, status, ...)
+MSG_ACTION = 1      # payload: agent u8, action u8
+MSG_STATE = 2       # payload: info + H, W + lưới uint8 + agents
+MSG_DELTA = 3       # payload: info + since + các ô (x, y, giá trị) + agents
+MSG_YOUR_TURN = 4   # payload: agent u8, tick u32
+
+_FRAME = struct.Struct("<IB")
+_ACTION = struct.Struct("<BB")
+_YOUR_TURN = struct.Struct("<BI")
+_INFO = struct.Struct("<IIBB")      # version, tick, current_turn, joint
+_SHAPE = struct.Struct("<HH")
+_DELTA = struct.Struct("<II")       # since, số ô
+_CELL_DTYPE = np.dtype([("x", "<u2"), ("y", "<u2"), ("v", "u1")])
+
+NO_AGENT = 255
+
+
+def hello(protocol: str = PROTOCOL_BINARY) -> bytes:
+    return (json.dumps({"type": "hello", "protocol": protocol}) + "\n").encode("utf-8")
+
+
+def frame(msg_type: int, payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), msg_type) + payload
+
+
+def encode_json(msg: dict) -> bytes:
+    return frame(MSG_JSON, json.dumps(msg).encode("utf-8"))
+
+
+def encode_line(msg: dict) -> bytes:
+    return (json.dumps(msg) + "\n").encode("utf-8")
+
+
+def encode_message(msg: dict, binary: bool = False) -> bytes:
+    return encode_json(msg) if binary else encode_line(msg)
+
+
+def encode_action(agent_idx: int, action) -> bytes:
+    return frame(MSG_ACTION, _ACTION.pack(agent_idx, encode_direction(action)))
+
+
+def encode_your_turn(agent_idx: int, tick: int) -> bytes:
+    return frame(MSG_YOUR_TURN, _YOUR_TURN.pack(agent_idx, tick))
+
+
+def _info(version, tick, current_turn, joint) -> bytes:
+    turn = NO_AGENT if current_turn is None else current_turn
+    return _INFO.pack(version, tick, turn, 1 if joint else 0)
+
+
+def encode_state_msg(state: GameState, version: int, tick: int, current_turn: int, joint: bool) -> bytes:
+    grid = np.ascontiguousarray(state.object_matrix, dtype=np.uint8)
+    return frame(MSG_STATE, b"".join((
+        _info(version, tick, current_turn, joint),
+        _SHAPE.pack(*grid.shape),
+        grid.tobytes(),
+        encode_agents(state)
+    )))
+
+
+def encode_delta_msg(state: GameState, cells: np.ndarray, since: int, version: int,
+                     tick: int, current_turn: int, joint: bool) -> bytes:
+    W = state.layout.width
+    packed = np.empty(len(cells), dtype=_CELL_DTYPE)
+    packed["x"] = cells % W
+    packed["y"] = cells // W
+    packed["v"] = cell_values(state, cells)
+    return frame(MSG_DELTA, b"".join((
+        _info(version, tick, current_turn, joint),
+        _DELTA.pack(since, len(cells)),
+        packed.tobytes(),
+        encode_agents(state)
+    )))
+
+
+def _decode_info(msg_type: str, payload) -> dict:
+    version, tick, turn, joint = _INFO.unpack_from(payload, 0)
+    return {
+        "type": msg_type,
+        "version": version,
+        "tick": tick,
+        "current_turn": None if turn == NO_AGENT else turn,
+        "joint": bool(joint)
+    }
+
+
+def decode_frame(msg_type: int, payload: bytes) -> dict:
+    """Frame -> dict cùng dạng message JSON.
+
+    State đầy đủ được giải mã thẳng thành GameState ở khóa "game_state"
+    (không qua object_matrix dạng list); delta giữ dạng của serialize_delta.
+    """
+    if msg_type == MSG_JSON:
+        return json.loads(payload)
+    if msg_type == MSG_ACTION:
+        agent_idx, code = _ACTION.unpack(payload)
+        return {"type": "action", "agent": agent_idx, "action": decode_direction(code, "Stop")}
+    if msg_type == MSG_YOUR_TURN:
+        agent_idx, tick = _YOUR_TURN.unpack(payload)
+        return {"type": "your_turn", "agent": agent_idx, "tick": tick}
+    if msg_type == MSG_STATE:
+        msg = _decode_info("state", payload)
+        offset = _INFO.size
+        H, W = _SHAPE.unpack_from(payload, offset)
+        offset += _SHAPE.size
+        grid = np.frombuffer(payload, dtype=np.uint8, count=H * W, offset=offset).reshape(H, W)
+        agents = decode_agents(payload, offset + H * W)
+        msg["game_state"] = GameState.from_matrix(
+            grid,
+            pacman=AgentInfo(**agents["pacman"]),
+            ghosts=[GhostInfo(**g) for g in agents["ghosts"]],
+            score=agents["score"],
+            win=agents["win"],
+            lose=agents["lose"]
+        )
+        return msg
+    if msg_type == MSG_DELTA:
+        msg = _decode_info("state_delta", payload)
+        offset = _INFO.size
+        since, n = _DELTA.unpack_from(payload, offset)
+        offset += _DELTA.size
+        cells = np.frombuffer(payload, dtype=_CELL_DTYPE, count=n, offset=offset)
+        delta = decode_agents(payload, offset + n * _CELL_DTYPE.itemsize)
+        delta["cells"] = cells.tolist()
+        msg.update(since=since, delta=delta)
+        return msg
+    raise ValueError(f"Unknown frame type {msg_type}")
+
+
+class FrameReader:
+    """Gom byte nhận được và cắt thành frame; buffer được đọc theo offset nên tuyến tính."""
+
+    def __init__(self, data: bytes = b""):
+        self._buffer = bytearray(data)
+
+    def feed(self, data: bytes = b""):
+        buf = self._buffer
+        buf += data
+        frames = []
+        offset, end = 0, len(buf)
+        while end - offset >= _FRAME.size:
+            length, msg_type = _FRAME.unpack_from(buf, offset)
+            start = offset + _FRAME.size
+            if end - start < length:
+                break
+            frames.append((msg_type, bytes(buf[start:start + length])))
+            offset = start + length
+        if offset:
+            del buf[:offset]
+        return frames
+
+    def messages(self, data: bytes = b""):
+        return [decode_frame(t, p) for t, p in self.feed(data)]
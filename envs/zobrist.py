@@ -0,0 +1,41 @@
+# zobrist.py
+# -------------------------
+# Khóa Zobrist 64-bit sinh bằng splitmix64 (không cần bảng ngẫu nhiên theo map)
+# -------------------------
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+PACMAN = 1
+GHOST = 2
+SCARED = 3
+FOOD = 4
+CAPSULE = 5
+
+
+def splitmix64(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def key(kind: int, value: int, index: int = 0) -> int:
+    return splitmix64((((kind << 12) | index) << 40) ^ value)
+
+
+def _splitmix64_array(x: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def xor_keys(kind: int, values: np.ndarray, index=0) -> int:
+    # index có thể là số nguyên hoặc mảng cùng kích thước với values
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return 0
+    base = (np.uint64(kind << 12) | np.asarray(index, dtype=np.uint64)) << np.uint64(40)
+    return int(np.bitwise_xor.reduce(_splitmix64_array(base ^ values), axis=None))
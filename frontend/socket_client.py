@@ -1,55 +1,133 @@
 import socket
 import json
+from collections import deque
+
+from envs.game_state import deserialize_state
+from envs.state_delta import apply_delta
+from envs import wire_protocol as wire
 
 class SocketClient:
-    def __init__(self, host="127.0.0.1", port=50008):
+    def __init__(self, host="127.0.0.1", port=50008, protocol=wire.PROTOCOL_JSON):
+        # protocol: "json" (dòng JSON, dễ debug) hoặc "binary" (frame có độ dài, thương lượng khi connect)
         self.host = host
         self.port = port
+        self.protocol = protocol
         self.sock = None
-        self._buffer = ""
+        self._buffer = b""
+        self._reader = None
+        self._pending = deque()
+        # bản sao state cục bộ, cập nhật từ snapshot "state" và patch "state_delta"
+        self.mirror = None
+        self.mirror_version = None
+
+    @property
+    def binary(self) -> bool:
+        return self._reader is not None
 
     def connect(self):
         try:
+            self._buffer = b""
+            self._reader = None
+            self._pending.clear()
+            self.mirror = None
+            self.mirror_version = None
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.sock.settimeout(1.0)
             self.sock.connect((self.host, self.port))
+            if self.protocol == wire.PROTOCOL_BINARY:
+                self._negotiate()
             return True
         except Exception as e:
             print(f"[SocketClient] Connect error: {e}")
             self.sock = None
             return False
 
+    def _negotiate(self):
+        self.sock.sendall(wire.hello(wire.PROTOCOL_BINARY))
+        while b"\n" not in self._buffer:
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionResetError("server closed the connection during handshake")
+            self._buffer += data
+        line, rest = self._buffer.split(b"\n", 1)
+        reply = json.loads(line)
+        if reply.get("type") == "hello" and reply.get("protocol") == wire.PROTOCOL_BINARY:
+            self._reader = wire.FrameReader(rest)
+            self._buffer = b""
+        else:
+            # server cũ không hiểu hello: giữ JSON
+            self._buffer = rest
+
     def send(self, msg: dict):
         if self.sock:
             try:
-                self.sock.sendall((json.dumps(msg) + "\n").encode("utf-8"))
+                if self._reader is None:
+                    data = (json.dumps(msg) + "\n").encode("utf-8")
+                elif msg.get("type") == "action" and isinstance(msg.get("agent"), int):
+                    data = wire.encode_action(msg["agent"], msg.get("action"))
+                else:
+                    data = wire.encode_json(msg)
+                self.sock.sendall(data)
             except Exception as e:
                 print(f"[SocketClient] Send error: {e}")
                 self.sock = None
 
+    def _read_messages(self):
+        data = self.sock.recv(65536)
+        if not data:
+            self.close()
+            return False
+        if self._reader is not None:
+            self._pending.extend(self._reader.messages(data))
+            return True
+        # tách mọi dòng hoàn chỉnh một lần, phần dở dang giữ lại
+        self._buffer += data
+        lines = self._buffer.split(b"\n")
+        self._buffer = lines.pop()
+        self._pending.extend(json.loads(line) for line in lines if line.strip())
+        return True
+
     def recv(self, timeout=0.1):
-        if not self.sock:
+        if not self.sock and not self._pending:
             return None
         try:
-            self.sock.settimeout(timeout)
-            data = self.sock.recv(8192)
-            if not data:
-                return None
-
-            self._buffer += data.decode("utf-8")
-            if "\n" not in self._buffer:
-                return None
+            if self.sock:
+                self.sock.settimeout(timeout)
+            while not self._pending:
+                if not self._read_messages():
+                    return None
 
-            line, self._buffer = self._buffer.split("\n", 1)
-            line = line.strip()
-            if not line:
-                return None
-            return json.loads(line)
+            msg = self._pending.popleft()
+            if msg.get("type") in ("state", "state_delta") and "version" in msg:
+                self._update_mirror(msg)
+            return msg
+        except socket.timeout:
+            return None
         except Exception as e:
             print(f"[SocketClient] Recv error: {e}")
             return None
 
+    def _update_mirror(self, msg: dict):
+        if msg["type"] == "state":
+            self.mirror = msg["game_state"] if "game_state" in msg else deserialize_state(msg["state"])
+            self.mirror_version = msg["version"]
+        elif self.mirror is not None and msg.get("since") == self.mirror_version:
+            apply_delta(self.mirror, msg["delta"])
+            self.mirror_version = msg["version"]
+        else:
+            # lỡ mất bản cập nhật: bỏ mirror và xin lại snapshot
+            self.mirror = None
+            self.mirror_version = None
+            self.send({"type": "resync"})
+
+    def request_state(self):
+        msg = {"type": "request_state"}
+        if self.mirror_version is not None:
+            msg["since"] = self.mirror_version
+        self.send(msg)
+
     def close(self):
         if self.sock:
             self.sock.close()
-            self.sock = None
\ No newline at end of file
+            self.sock = None
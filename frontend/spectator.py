@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from frontend.socket_client import SocketClient
+from ui.tkinter_ui import TkinterDisplay
+from config.socket_config import HOST, PORT, PROTOCOL
+from config.backend_config import DISPLAY_INTERVAL
+
+
+class Spectator:
+    """Process xem ván: subscribe luồng state (delta) của một phòng và vẽ theo nhịp riêng.
+
+    Các state tới giữa hai khung hình chỉ được áp vào mirror, mỗi khung vẽ state mới nhất.
+    """
+
+    def __init__(self, room: str = None, fps: float = 1.0 / DISPLAY_INTERVAL, zoom: float = 1.5,
+                 host: str = HOST, port: int = PORT, protocol: str = PROTOCOL):
+        self.room = room
+        self.frame_time = 1.0 / fps
+        self.zoom = zoom
+        self.client = SocketClient(host=host, port=port, protocol=protocol)
+        self.display = None
+        self._drawn_version = None
+        self._layout = None
+
+    def subscribe(self):
+        msg = {"type": "subscribe", "delta": True}
+        if self.room:
+            msg["room"] = self.room
+        self.client.send(msg)
+
+    def drain(self):
+        # nhận hết message đang chờ; SocketClient tự cập nhật client.mirror
+        while True:
+            msg = self.client.recv(timeout=0.001)
+            if msg is None:
+                return
+            if msg.get("type") in ("room_closed", "error"):
+                raise ConnectionResetError(msg.get("error") or f"room {msg.get('room')} closed")
+
+    def draw(self):
+        state = self.client.mirror
+        if state is None or self.client.mirror_version == self._drawn_version:
+            return
+        if state.layout is not self._layout:
+            # map mới: dựng lại cửa sổ theo kích thước layout
+            if self.display is not None:
+                self.display.finish()
+            self.display = TkinterDisplay(zoom=self.zoom, title=f"Pacman - {self.room or 'spectator'}")
+            self.display.initialize(state)
+            self._layout = state.layout
+        self.display.update(state)
+        self._drawn_version = self.client.mirror_version
+
+    def run(self):
+        while True:
+            if not self.client.connect():
+                print("[Spectator] Cannot connect, retrying in 2s...")
+                time.sleep(2)
+                continue
+            self.subscribe()
+            try:
+                while True:
+                    start = time.monotonic()
+                    self.drain()
+                    if self.client.sock is None:
+                        raise ConnectionResetError("server closed the connection")
+                    self.draw()
+                    if self.display is not None:
+                        self.display.get_root().update()
+                    time.sleep(max(0.0, self.frame_time - (time.monotonic() - start)))
+            except ConnectionResetError as e:
+                print(f"[Spectator] Connection lost: {e}, retrying in 2s...")
+                self.client.close()
+                time.sleep(2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Xem ván đang chạy trên backend (kể cả backend headless).")
+    parser.add_argument("--room", default=None, help="phòng cần xem (mặc định: phòng mặc định)")
+    parser.add_argument("--fps", type=float, default=1.0 / DISPLAY_INTERVAL)
+    parser.add_argument("--zoom", type=float, default=1.5)
+    args = parser.parse_args()
+    Spectator(room=args.room, fps=args.fps, zoom=args.zoom).run()
+
+
+if __name__ == "__main__":
+    main()
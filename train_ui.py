@@ -7,35 +7,36 @@ PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from backend.pacman_game import PacmanGame
 from agents.factory import make_agent
 from envs.directions import Directions
+from envs.pacman_env import PacmanEnv, REWARD_SCORE
+from envs.layout_registry import get_registry
 from ui.tkinter_ui import TkinterDisplay
-from config import point
 
-MAP_FILE = os.path.join(PROJECT_ROOT, "maps/mediumClassic.map")
+# tên layout trong maps/, xoay vòng theo episode
+MAP_NAMES = ["mediumClassic"]
 
 NUM_EPISODES = 10000
 SAVE_EVERY = 1
 
 SHOW_UI_EVERY = 1
 FRAME_TIME = 0.001
+SEED = None
+# reward giữ như vòng huấn luyện cũ (tổng điểm sau nước đi của Pacman); REWARD_DELTA: điểm thay đổi mỗi step
+REWARD_MODE = REWARD_SCORE
 
 
 def train():
-    tmp_game = PacmanGame(MAP_FILE)
-    h, w = tmp_game.get_state_size()
-    state_shape = (1, h, w) 
-
-    pacman = make_agent("dqn_pacman", 0, state_shape=state_shape)
-
     ghosts = [
         make_agent("random_ghost", 1),
         make_agent("random_ghost", 2)
     ]
+    layouts = get_registry().cycle(MAP_NAMES)
+    env = PacmanEnv(MAP_NAMES[0], ghost_agents=ghosts, reward_mode=REWARD_MODE)
+    h, w = env.initial_state.shape
+    state_shape = (1, h, w) 
 
-    all_agents = [pacman] + ghosts
-    num_agents = len(all_agents)
+    pacman = make_agent("dqn_pacman", 0, state_shape=state_shape)
 
     print("\n--- BẮT ĐẦU HUẤN LUYỆN ---")
     print(f"Hiển thị UI mỗi {SHOW_UI_EVERY} episode\n")
@@ -47,58 +48,34 @@ def train():
             if ep % SHOW_UI_EVERY == 0 else None
         )
 
-        game = PacmanGame(MAP_FILE, display=current_display)
-        state = game.get_state()
+        state = env.reset(seed=None if SEED is None else SEED + ep, layout=next(layouts))
 
         if current_display:
+            current_display.initialize(state)
             current_display.update(state)
 
-        last_score = 0
         step_count = 0
         done = False
 
-        time1 = 0
-
         while not done:
-            # time1 += 1
-            curr_idx = step_count % num_agents
-            agent = all_agents[curr_idx]
+            legal_actions = state.getLegalActions(0)
+            action = pacman.getAction(state) if legal_actions else Directions.LEFT
 
-            legal_actions = state.getLegalActions(curr_idx)
-            action = agent.getAction(state) if legal_actions else Directions.LEFT
-
-            game.apply_action(curr_idx, action)
-            next_state = game.get_state()
+            next_state, reward, done, info = env.step(action)
 
             if current_display:
                 current_display.update(next_state)
 
-            if curr_idx == 0:  # pacman
-                current_score = next_state.getScore()
-                reward = current_score
-                # reward += point.TIME_PENALTY
-                done = game.check_game_over()
-
-                if done:
-                    if next_state.isWin():
-                        reward += point.WIN_REWARD
-                    elif next_state.isLose():
-                        reward += point.PACMAN_DEATH_PENALTY
-
-                print(f"Step {step_count}: Action={action}, Reward={reward:.2f}, Score={current_score:.1f}")
-
-                if hasattr(pacman, "update_policy"):
-                    pacman.update_policy(
-                        state,
-                        action,
-                        reward,
-                        next_state,
-                        done
-                    )
-
-                last_score = current_score
-            else:
-                done = game.check_game_over()
+            print(f"Step {step_count}: Action={action}, Reward={reward:.2f}, Score={info['score']:.1f}")
+
+            if hasattr(pacman, "update_policy"):
+                pacman.update_policy(
+                    state,
+                    action,
+                    reward,
+                    next_state,
+                    done
+                )
 
             state = next_state
             step_count += 1
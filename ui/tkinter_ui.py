@@ -51,11 +51,13 @@ class TkinterDisplay(BaseDisplay):
         if color is None:
             color = self._formatColor(0, 0, 0)
         if self._root:
-            self._root.destroy()
-        self._root = tkinter.Tk()
-        self._root.title(self._title)
-        self._root.resizable(0, 0)
-        self._root.protocol("WM_DELETE_WINDOW", lambda: sys.exit(0))
+            # dùng lại cửa sổ: mainloop / after của chủ display vẫn chạy trên root này
+            self._canvas.destroy()
+        else:
+            self._root = tkinter.Tk()
+            self._root.title(self._title)
+            self._root.resizable(0, 0)
+            self._root.protocol("WM_DELETE_WINDOW", lambda: sys.exit(0))
         self._canvas = tkinter.Canvas(self._root, width=width, height=height, bg=color, highlightthickness=0)
         self._canvas.pack()
         self._window_closed = False
@@ -90,7 +92,11 @@ class TkinterDisplay(BaseDisplay):
             self._canvas = None
 
     def initialize(self, state: GameState):
-        h, w = state.object_matrix.shape
+        # gọi lại khi đổi map: shape của layout cũ bỏ theo canvas cũ
+        self.shapes = {}
+        self.pacman_shape = None
+        self.ghost_shapes = {}
+        h, w = state.shape
         self._begin_graphics(w * self.grid_size, (h + 1) * self.grid_size)
         self.score_id = self._text((10, h * self.grid_size + 5), "white", "Score: 0")
 
@@ -145,8 +151,8 @@ class TkinterDisplay(BaseDisplay):
         if state.pacman:
             self._render_pacman(state.pacman.x, state.pacman.y, state.pacman.dir)
 
-        for i, ghost in enumerate(state.ghosts):
-            self._render_ghost(i, ghost.x, ghost.y, state)
+        for i, (gx, gy) in enumerate(state.ghost_xy.tolist()):
+            self._render_ghost(i, gx, gy, state)
 
         self._changeText(self.score_id, f"Score: {int(state.score)}")
         self._refresh()
@@ -189,8 +195,7 @@ class TkinterDisplay(BaseDisplay):
         cx, cy = (x + 0.5) * self.grid_size, (y + 0.5) * self.grid_size
         r = self.grid_size * self.GHOST_RADIUS
         
-        ghost_obj = state.ghosts[idx]
-        scared = ghost_obj.scared_timer > 0
+        scared = state.scared[idx] > 0
         color = self.SCARED_COLOR if scared else self.GHOST_COLORS[idx % len(self.GHOST_COLORS)]
 
         self.ghost_shapes[idx].append(self._canvas.create_arc(cx-r, cy-r, cx+r, cy+r/2, start=0, extent=180, fill=color, outline=color))
@@ -8,23 +8,79 @@ if PROJECT_ROOT not in sys.path:
 
 from frontend.socket_client import SocketClient
 from agents.factory import make_agent
-from envs.game_state import deserialize_state
-from config.socket_config import HOST, PORT
+from config.socket_config import HOST, PORT, PROTOCOL, TRANSPORT, TRANSPORT_SHM
+from config.backend_config import DEFAULT_ROOM
+from envs.shm_transport import SharedStateReader, block_name
+
+def run_shared_memory(agent_idx, algo, agent, room):
+    """Worker cùng máy: đọc state từ shared memory của phòng, gửi action qua ring."""
+    name = block_name(PORT, room or DEFAULT_ROOM)
+    while True:
+        try:
+            reader = SharedStateReader(name)
+        except FileNotFoundError:
+            print(f"[Worker {agent_idx}] Shared memory '{name}' not found, retrying in 2s...")
+            time.sleep(2)
+            continue
+
+        print(f"--- [Agent {agent_idx} | Algo: {algo} | shm: {name}] Running ---")
+        last_game_state = None
+        last_action = None
+        last_score = 0
+        last_acted_tick = None
+        seq = None
+        try:
+            while True:
+                if not reader.wait(seq, timeout=1.0):
+                    continue
+                seq, info, game_state = reader.read()
+                if info["replaced"]:
+                    # map mới không vừa block cũ: backend đã tạo block mới cùng tên
+                    print(f"[Worker {agent_idx}] Shared memory '{name}' replaced, reattaching...")
+                    break
+                if info["closed"]:
+                    print(f"[Worker {agent_idx}] Room closed, retrying in 2s...")
+                    break
+
+                tick = info["tick"]
+                if not (info["joint"] or info["current_turn"] == agent_idx) or tick == last_acted_tick:
+                    continue
+
+                current_score = game_state.score
+                if hasattr(agent, "update_policy") and last_game_state is not None and last_action is not None:
+                    agent.update_policy(last_game_state, last_action, current_score - last_score, game_state, False)
+
+                action = agent.getAction(game_state)
+                if action and reader.post_action(agent_idx, action, tick):
+                    last_game_state = game_state
+                    last_action = action
+                    last_score = current_score
+                    last_acted_tick = tick
+        finally:
+            reader.close()
+        if not info["replaced"]:
+            time.sleep(2)
 
 def main():
     if len(sys.argv) < 3:
-        print("Usage: python agent_worker.py <agent_idx> <algo>")
+        print("Usage: python agent_worker.py <agent_idx> <algo> [room]")
         sys.exit(1)
 
     agent_idx = int(sys.argv[1])
     algo = sys.argv[2]
+    room = sys.argv[3] if len(sys.argv) > 3 else None
     agent = make_agent(algo, agent_idx)
 
-    client = SocketClient(host=HOST, port=PORT)
+    if TRANSPORT == TRANSPORT_SHM:
+        run_shared_memory(agent_idx, algo, agent, room)
+        return
+
+    client = SocketClient(host=HOST, port=PORT, protocol=PROTOCOL)
 
     last_game_state = None
     last_action = None
     last_score = 0
+    last_acted_tick = None
 
     while True:
         try:
@@ -35,32 +91,52 @@ def main():
 
             print(f"--- [Agent {agent_idx} | Algo: {algo}] Running ---")
 
+            # backend đẩy state (delta theo version) sau mỗi tick và báo "your_turn" khi tới lượt;
+            # SocketClient tự áp dụng delta vào client.mirror
+            subscribe = {"type": "subscribe", "agent": agent_idx, "delta": True}
+            if room:
+                subscribe["room"] = room
+            client.send(subscribe)
+            state_msg = None
+
             while True:
-                client.send({"type": "request_state", "agent": agent_idx})
                 msg = client.recv(timeout=1.0)
-                
-                if not msg or msg.get("type") != "state":
-                    time.sleep(0.05)
+                if not msg:
+                    if client.sock is None:
+                        raise ConnectionResetError("server closed the connection")
                     continue
 
-                game_state = deserialize_state(msg.get("state"))
-                
-                current_score = getattr(game_state, "score", 0)
-                reward = msg.get("reward", current_score - last_score)
-                done = msg.get("done") or (msg.get("status") == "finished")
-                if hasattr(agent, "update_policy") and last_game_state is not None and last_action is not None:
-                    agent.update_policy(last_game_state, last_action, reward, game_state, done)
-                if done:
-                    last_game_state = None
-                    last_action = None
-                    last_score = 0
-                    time.sleep(0.5) 
+                if msg.get("type") in ("room_closed", "error"):
+                    raise ConnectionResetError(msg.get("error") or f"room {msg.get('room')} closed")
+
+                if msg.get("type") in ("state", "state_delta"):
+                    state_msg = msg
+                    done = msg.get("done") or (msg.get("status") == "finished")
+                    if done:
+                        if hasattr(agent, "update_policy") and last_game_state is not None and last_action is not None \
+                                and client.mirror is not None:
+                            game_state = client.mirror.copy()
+                            reward = msg.get("reward", game_state.score - last_score)
+                            agent.update_policy(last_game_state, last_action, reward, game_state, done)
+                        last_game_state = None
+                        last_action = None
+                        last_score = 0
                     continue
 
-                if msg.get("current_turn") != agent_idx:
-                    time.sleep(0.05)
+                if msg.get("type") != "your_turn" or state_msg is None or client.mirror is None:
+                    continue
+                # chỉ hành động trên state của đúng tick được báo, mỗi tick một lần
+                tick = msg.get("tick")
+                if tick != state_msg.get("tick") or state_msg.get("version") != client.mirror_version \
+                        or tick == last_acted_tick:
                     continue
 
+                # mirror tiếp tục bị patch tại chỗ nên agent nhận bản copy (copy-on-write, rẻ)
+                game_state = client.mirror.copy()
+                current_score = getattr(game_state, "score", 0)
+                if hasattr(agent, "update_policy") and last_game_state is not None and last_action is not None:
+                    agent.update_policy(last_game_state, last_action, current_score - last_score, game_state, False)
+
                 if last_game_state is None:
                     last_score = current_score
 
@@ -72,8 +148,7 @@ def main():
                     last_game_state = game_state
                     last_action = action
                     last_score = current_score
-
-                time.sleep(0.05)
+                    last_acted_tick = tick
 
         except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError) as e:
             print(f"[Worker {agent_idx}] Connection lost: {e}, retrying in 2s...")